@@ -1,40 +1,152 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain.agents import AgentType
 import pandas as pd
 import io
 import os
 from typing import List
-from component.response import llm_key
+from component.llm_cache import cached_response
+from component.rate_limit import Overloaded
+from component.dataframe_cache import dataframe_cache
+from component.llm_clients import get_chat_model
+from pandas.api.types import union_categoricals
+import numpy as np
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
 
-def process_with_pandas_agent(csv_content_list: List[str], query: str) -> str:
+
+# Sample used to pick column dtypes before the full parse: the first block
+# with pyarrow, the first rows with the pandas C engine
+CSV_SAMPLE_BYTES = int(os.getenv('CSV_SAMPLE_BYTES', 1024 * 1024))
+CSV_SAMPLE_ROWS = int(os.getenv('CSV_SAMPLE_ROWS', 10000))
+# String columns become categoricals when the sample has at most this share of distinct values
+CSV_CATEGORY_RATIO = float(os.getenv('CSV_CATEGORY_RATIO', 0.5))
+CSV_CATEGORY_MAX_UNIQUE = int(os.getenv('CSV_CATEGORY_MAX_UNIQUE', 10000))
+# Opt-in: narrow int64 columns to int32 when their values fit. Never narrower, and
+# floats stay float64, since the agent's generated arithmetic runs in the column dtype.
+CSV_DOWNCAST_INTEGERS = os.getenv('CSV_DOWNCAST_INTEGERS', 'false').lower() in ('1', 'true', 'yes')
+
+
+CSV_AGENT_MODEL= {'model': 'gemini-1.5-flash', 'temperature': 0.1, 'max_output_tokens': 2000}
+
+llm= get_chat_model(**CSV_AGENT_MODEL)
+
+
+def _is_categorical(unique, non_null):
+    return non_null > 0 and unique <= min(CSV_CATEGORY_MAX_UNIQUE, max(1, non_null * CSV_CATEGORY_RATIO))
+
+
+def _read_csv_arrow(raw: bytes):
+    """
+    Parse with pyarrow.csv. The sample is the first block read by the same
+    parser, so its inferred types and NA handling match the full read.
+    Columns picked as categorical are converted straight to dictionary
+    arrays by the parser.
+    """
+    reader = pa_csv.open_csv(io.BytesIO(raw), read_options=pa_csv.ReadOptions(block_size=CSV_SAMPLE_BYTES))
+    sample = reader.read_next_batch()
+
+    column_types = {}
+    for name, column in zip(sample.schema.names, sample.columns):
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            if _is_categorical(pc.count_distinct(column).as_py(), len(column) - column.null_count):
+                column_types[name] = pa.dictionary(pa.int32(), pa.string())
+
+    table = pa_csv.read_csv(io.BytesIO(raw), convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    return table.to_pandas(date_as_object=False), sample.to_pandas(date_as_object=False), len(column_types)
+
+
+def _read_csv_pandas(raw: bytes):
+    """Parse with the pandas C engine, sampling its first rows with the same engine."""
+    sample = pd.read_csv(io.BytesIO(raw), nrows=CSV_SAMPLE_ROWS)
+    dtypes = {}
+    for column in sample.columns:
+        values = sample[column].dropna()
+        is_text = sample[column].dtype == object or isinstance(sample[column].dtype, pd.StringDtype)
+        if is_text and _is_categorical(values.nunique(), len(values)):
+            dtypes[column] = 'category'
+    return pd.read_csv(io.BytesIO(raw), dtype=dtypes), sample, len(dtypes)
+
+
+def downcast_integers(df: pd.DataFrame) -> pd.DataFrame:
+    int32 = np.iinfo(np.int32)
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == np.int64 and len(series) and int32.min <= series.min() and series.max() <= int32.max:
+            df[column] = series.astype(np.int32)
+    return df
+
+
+def read_csv_compact(csv_content) -> pd.DataFrame:
+    """
+    Parse a CSV straight from its bytes with compact dtypes: sampled
+    categoricals for repetitive strings and, when enabled, int32 integers.
+    """
+    raw = csv_content.encode('utf-8') if isinstance(csv_content, str) else csv_content
+
+    if pa is not None:
+        try:
+            df, sample, categorical = _read_csv_arrow(raw)
+        except Exception as e:
+            # e.g. a later block that does not fit the types inferred from the first
+            print(f"pyarrow CSV parse failed, falling back to the pandas C engine: {e}")
+            df, sample, categorical = _read_csv_pandas(raw)
+    else:
+        df, sample, categorical = _read_csv_pandas(raw)
+    if CSV_DOWNCAST_INTEGERS:
+        df = downcast_integers(df)
+
+    # Rough indication only: the default-dtype size is extrapolated from the
+    # sample rows, not measured, as building the default frame would defeat the point
+    if len(sample):
+        estimated_default_bytes = sample.memory_usage(deep=True).sum() / len(sample) * len(df)
+        compact_bytes = df.memory_usage(deep=True).sum()
+        print(f"CSV loaded: {len(df)} rows, {compact_bytes / 2**20:.1f} MB measured, default dtypes estimated at ~{estimated_default_bytes / 2**20:.1f} MB from the sample, {categorical} categorical columns")
+    return df
+
+
+def concat_frames(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate CSV frames keeping categoricals categorical: pd.concat falls
+    back to object dtype unless every frame shares the same categories.
+    """
+    if len(dataframes) == 1:
+        return dataframes[0]
+
+    shared = set(dataframes[0].columns).intersection(*[df.columns for df in dataframes[1:]])
+    for column in shared:
+        if all(isinstance(df[column].dtype, pd.CategoricalDtype) for df in dataframes):
+            categories = union_categoricals([df[column] for df in dataframes]).categories
+            for df in dataframes:
+                df[column] = df[column].cat.set_categories(categories)
+
+    return pd.concat(dataframes, ignore_index=True, copy=False)
+
+
+@cached_response('csv_agent', CSV_AGENT_MODEL)
+def process_with_pandas_agent(csv_content_list: List[bytes], query: str) -> str:
     """
     Process CSV data using Pandas Agent
     
     Args:
-        csv_content_list: List of CSV strings from Firebase
+        csv_content_list: List of CSV file contents (bytes, or str from older parse caches) from Firebase
         query: Question to ask about the data
     Returns:
         str: Agent's response to the query
     """
     try:
-        # Initialize LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=llm_key,
-            temperature=0.1,
-            max_output_tokens=2000
-        )
-
-        # Convert all CSV strings to DataFrames
-        dataframes = [pd.read_csv(io.StringIO(csv)) for csv in csv_content_list]
+        # Convert all CSV contents to compact DataFrames, parsing each file once
+        dataframes = [
+            dataframe_cache.get_or_build('csv', csv, lambda csv=csv: read_csv_compact(csv))
+            for csv in csv_content_list
+        ]
         
         # Combine all DataFrames (if multiple)
-        if len(dataframes) > 1:
-            combined_df = pd.concat(dataframes, ignore_index=True)
-        else:
-            combined_df = dataframes[0]
+        combined_df = concat_frames(dataframes)
             
         # Create Pandas agent
         agent = create_pandas_dataframe_agent(
@@ -49,5 +161,7 @@ def process_with_pandas_agent(csv_content_list: List[str], query: str) -> str:
         response = agent.run(query)
         return response
         
+    except Overloaded:
+        raise
     except Exception as e:
-        raise f"Error processing data: {str(e)}"
+        return f"Error processing data: {str(e)}"
@@ -1,29 +1,29 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain.agents import AgentType
 import pandas as pd
 import io
 import os
 from typing import List
-from component.response import llm_key
+from component.llm_cache import cached_response
+from component.rate_limit import Overloaded
+from component.llm_clients import get_chat_model
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.chains import LLMChain
 import os
 
 
+JSON_AGENT_MODEL= {'model': 'gemini-1.5-flash', 'temperature': 0}
+
+llm= get_chat_model(**JSON_AGENT_MODEL)
+
+
+@cached_response('json_agent', JSON_AGENT_MODEL)
 def analyze_json(json_data, query):
     """
     Analyze JSON data using ChatGoogleGenerativeAI with direct reasoning.
     """
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=llm_key,
-            temperature=0
-        )
-
         # Create a prompt template that encourages direct reasoning
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a JSON analysis expert. Given a JSON structure and a question, 
@@ -43,5 +43,7 @@ def analyze_json(json_data, query):
 
         return response["text"]
 
+    except Overloaded:
+        raise
     except Exception as e:
         return f"Error during analysis: {str(e)}"
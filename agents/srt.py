@@ -5,7 +5,10 @@ import pandas as pd
 import io
 import os
 from typing import List, Dict
-from component.response import llm
+from component.response import llm, DOC_AGENT_PARAMS
+from component.llm_cache import cached_response
+from component.rate_limit import Overloaded
+from component.dataframe_cache import dataframe_cache
 
 import re
 from datetime import datetime
@@ -90,8 +93,8 @@ class SRTProcessor:
             DataFrame containing subtitle data
         """
         try:
-            subtitles = self.parse_srt(srt_content)
-            return pd.DataFrame(subtitles)
+            # Parsed subtitles are cached by content; the frame returned is a copy
+            return dataframe_cache.get_or_build('srt', srt_content, lambda: pd.DataFrame(self.parse_srt(srt_content)))
         except Exception as e:
             raise Exception(f"Error converting to DataFrame: {str(e)}")
 
@@ -132,9 +135,12 @@ class SRTProcessor:
             response = agent.run(query)
             return response
             
+        except Overloaded:
+            raise
         except Exception as e:
             return f"Error processing SRT data: {str(e)}"
 
+@cached_response('srt_agent', DOC_AGENT_PARAMS)
 def process_firebase_srt(blob_contents: List[str], query: str) -> str:
     """
     Process SRT files from Firebase
@@ -148,5 +154,7 @@ def process_firebase_srt(blob_contents: List[str], query: str) -> str:
     try:
         processor = SRTProcessor()
         return processor.process_srt_data(blob_contents, query)
+    except Overloaded:
+        raise
     except Exception as e:
         return f"Error processing Firebase SRT: {str(e)}"
\ No newline at end of file
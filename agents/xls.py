@@ -1,15 +1,253 @@
 import openpyxl
-from langchain_google_genai import ChatGoogleGenerativeAI
+import xlrd
+import re
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain.agents import AgentType
 import pandas as pd
 import io
 import os
 from typing import List
-from component.response import llm_key
+from component.llm_cache import cached_response
+from component.rate_limit import Overloaded
+from component.dataframe_cache import dataframe_cache, content_digest
+from collections import OrderedDict
+import threading
+from component.llm_clients import get_chat_model
 
 
+EXCEL_AGENT_MODEL= {'model': 'gemini-1.5-flash', 'temperature': 0.1, 'max_output_tokens': 2000}
 
+llm= get_chat_model(**EXCEL_AGENT_MODEL)
+
+
+# Rows are buffered into DataFrames this many at a time while streaming a sheet
+EXCEL_CHUNK_ROWS = int(os.getenv('EXCEL_CHUNK_ROWS', 50000))
+
+# Workbooks below this many cells (rows x columns over all sheets) always load
+# every sheet; above it, sheets whose name appears in the question are enough.
+# An explicit reference ("the Sales sheet", 'Sales') narrows any workbook.
+EXCEL_SELECT_MIN_CELLS = int(os.getenv('EXCEL_SELECT_MIN_CELLS', 1000000))
+
+# Sheet catalogs of recently queried workbooks, keyed by content hash
+EXCEL_CATALOG_CACHE_SIZE = int(os.getenv('EXCEL_CATALOG_CACHE_SIZE', 256))
+
+XLS_MAGIC = b'\xd0\xcf\x11\xe0'  # OLE2 container of legacy .xls files
+
+_catalogs = OrderedDict()
+_catalogs_lock = threading.Lock()
+
+
+def _open_workbook(excel_content: bytes):
+    """
+    Open a workbook without loading its cells: openpyxl in read-only mode
+    for .xlsx, xlrd with on-demand sheets for legacy .xls.
+    """
+    if excel_content[:4] == XLS_MAGIC:
+        return 'xlrd', xlrd.open_workbook(file_contents=excel_content, on_demand=True)
+    return 'openpyxl', openpyxl.load_workbook(io.BytesIO(excel_content), read_only=True, data_only=True)
+
+
+def _close_workbook(engine, workbook):
+    if engine == 'xlrd':
+        workbook.release_resources()
+    else:
+        workbook.close()
+
+
+def _xlrd_rows(workbook, sheet):
+    for row_idx in range(sheet.nrows):
+        values = []
+        for cell in sheet.row(row_idx):
+            if cell.ctype == xlrd.XL_CELL_DATE:
+                values.append(xlrd.xldate_as_datetime(cell.value, workbook.datemode))
+            elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                values.append(None)
+            elif cell.ctype == xlrd.XL_CELL_NUMBER and float(cell.value).is_integer():
+                # xlrd stores every number as float; pandas returns whole numbers as int
+                values.append(int(cell.value))
+            else:
+                values.append(cell.value)
+        yield tuple(values)
+
+
+def _sheet_rows(engine, workbook, sheet_name):
+    if engine == 'xlrd':
+        return _xlrd_rows(workbook, workbook.sheet_by_name(sheet_name))
+    return workbook[sheet_name].iter_rows(values_only=True)
+
+
+def _column_names(header) -> list:
+    # Same naming pandas.read_excel uses: header values keep their type,
+    # blanks become "Unnamed: n" and repeats get a ".n" suffix
+    names, seen = [], {}
+    for idx, value in enumerate(header):
+        if value is None or str(value).strip() == '':
+            name = f'Unnamed: {idx}'
+        elif isinstance(value, float) and value.is_integer():
+            name = int(value)
+        else:
+            name = value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def sheet_catalog(excel_content: bytes) -> List[dict]:
+    """
+    Names, dimensions and header row of every sheet, read without
+    materializing any cell beyond the first row.
+    """
+    engine, workbook = _open_workbook(excel_content)
+    try:
+        catalog = []
+        if engine == 'xlrd':
+            for sheet_name in workbook.sheet_names():
+                sheet = workbook.sheet_by_name(sheet_name)
+                header = sheet.row_values(0) if sheet.nrows else []
+                catalog.append({'name': sheet_name, 'rows': sheet.nrows, 'columns': sheet.ncols, 'headers': _column_names(header)})
+                workbook.unload_sheet(sheet_name)
+        else:
+            for sheet in workbook.worksheets:
+                header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+                catalog.append({'name': sheet.title, 'rows': sheet.max_row, 'columns': sheet.max_column, 'headers': _column_names(header)})
+        return catalog
+    finally:
+        _close_workbook(engine, workbook)
+
+
+def cached_sheet_catalog(excel_content: bytes, digest: str) -> List[dict]:
+    with _catalogs_lock:
+        catalog = _catalogs.get(digest)
+        if catalog is not None:
+            _catalogs.move_to_end(digest)
+            return catalog
+
+    catalog = sheet_catalog(excel_content)
+    with _catalogs_lock:
+        _catalogs[digest] = catalog
+        while len(_catalogs) > EXCEL_CATALOG_CACHE_SIZE:
+            _catalogs.popitem(last=False)
+    return catalog
+
+
+def question_text(query: str) -> str:
+    # run_data_agent prefixes the chat history; only the question itself selects sheets
+    marker = '\nquery: '
+    return query.rsplit(marker, 1)[1] if marker in query else query
+
+
+SHEET_WORDS = r'(?:sheet|tab|worksheet)s?'
+QUOTES = '["\'`\u2018\u2019\u201c\u201d]'
+
+
+def _mentioned(name: str, text: str) -> bool:
+    return re.search(rf'(?<!\w){re.escape(name)}(?!\w)', text) is not None
+
+
+def _referenced(name: str, text: str) -> bool:
+    # Quoted, or next to "sheet"/"tab": "sheet Sales", "the Sales tab", "'Sales'"
+    n = re.escape(name)
+    pattern = (
+        rf'{QUOTES}{n}{QUOTES}'
+        rf'|(?<!\w){SHEET_WORDS}\s+(?:named\s+|called\s+)?{n}(?!\w)'
+        rf'|(?<!\w){n}\s+{SHEET_WORDS}(?!\w)'
+    )
+    return re.search(pattern, text) is not None
+
+
+def select_sheets(catalog: List[dict], question: str) -> List[str]:
+    """
+    Sheets the question explicitly refers to; in workbooks above
+    EXCEL_SELECT_MIN_CELLS, also sheets it merely names. Every sheet
+    otherwise, so a word like "summary" in the question cannot hide the
+    rest of a small workbook.
+    """
+    text = question.lower()
+    names = [(sheet['name'], sheet['name'].strip().lower()) for sheet in catalog]
+
+    relevant = [name for name, lowered in names if lowered and _referenced(lowered, text)]
+    # Read-only openpyxl reports no dimensions for files written without them; count those as small
+    cells = sum((sheet['rows'] or 0) * (sheet['columns'] or 0) for sheet in catalog)
+    if not relevant and cells > EXCEL_SELECT_MIN_CELLS:
+        relevant = [name for name, lowered in names if lowered and _mentioned(lowered, text)]
+    return relevant or [name for name, _ in names]
+
+
+def read_sheet(engine, workbook, sheet_name) -> pd.DataFrame:
+    """Stream one sheet into a DataFrame, EXCEL_CHUNK_ROWS rows at a time."""
+    rows = _sheet_rows(engine, workbook, sheet_name)
+    columns = _column_names(next(rows, ()))
+
+    def flush(buffer):
+        # Ragged rows: read-only mode only yields cells up to the last written one
+        width = len(columns)
+        return pd.DataFrame.from_records([row + (None,) * (width - len(row)) for row in buffer], columns=list(columns))
+
+    chunks, buffer = [], []
+    for row in rows:
+        if all(value is None for value in row):
+            continue
+        # Cells right of the header become "Unnamed: n" columns, as in read_excel
+        width = len(row)
+        while width > len(columns) and row[width - 1] is None:
+            width -= 1
+        if width > len(columns):
+            columns.extend(f'Unnamed: {idx}' for idx in range(len(columns), width))
+        buffer.append(tuple(row[:len(columns)]))
+        if len(buffer) >= EXCEL_CHUNK_ROWS:
+            chunks.append(flush(buffer))
+            buffer = []
+    if buffer or not chunks:
+        chunks.append(flush(buffer))
+
+    # Earlier chunks lack columns that only appear further down; concat fills them with NaN
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # Columns mixing numbers and blanks come back as object; let pandas narrow them
+    return df.infer_objects()
+
+
+def read_workbook(excel_content: bytes, sheet_names: List[str]) -> pd.DataFrame:
+    """The requested sheets of one workbook in a single DataFrame, tagged by source_sheet."""
+    engine, workbook = _open_workbook(excel_content)
+    try:
+        sheets = []
+        for sheet_name in sheet_names:
+            df = read_sheet(engine, workbook, sheet_name)
+            df['source_sheet'] = sheet_name  # Add sheet name as a column
+            sheets.append(df)
+            if engine == 'xlrd':
+                workbook.unload_sheet(sheet_name)
+    finally:
+        _close_workbook(engine, workbook)
+    return pd.concat(sheets, ignore_index=True) if len(sheets) > 1 else sheets[0]
+
+
+def load_workbook_for_query(excel_content: bytes, query: str):
+    """
+    The DataFrame of the sheets the question needs, and the names of the
+    sheets left out. Repeat questions hit the catalog and DataFrame caches
+    without reopening the workbook.
+    """
+    digest = content_digest(excel_content)
+    catalog = cached_sheet_catalog(excel_content, digest)
+    sheet_names = select_sheets(catalog, question_text(query))
+    skipped = [sheet['name'] for sheet in catalog if sheet['name'] not in sheet_names]
+    print(f"Excel catalog: {[(s['name'], s['rows'], s['columns']) for s in catalog]}, loading {sheet_names}")
+    # Cached per sheet selection, so a different question on other sheets parses only those
+    df = dataframe_cache.get_or_build(
+        'excel\0' + '\0'.join(sheet_names),
+        excel_content,
+        lambda: read_workbook(excel_content, sheet_names),
+        digest=digest,
+    )
+    return df, skipped
+
+
+@cached_response('excel_agent', EXCEL_AGENT_MODEL)
 def process_excel_with_pandas_agent(excel_content_list: List[bytes], query: str) -> str:
     """
     Process Excel data using Pandas Agent
@@ -21,28 +259,12 @@ def process_excel_with_pandas_agent(excel_content_list: List[bytes], query: str)
         str: Agent's response to the query
     """
     try:
-        # Initialize LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=llm_key,
-            temperature=0.1,
-            max_output_tokens=2000
-        )
-
-        # Convert all Excel contents to DataFrames
-        dataframes = []
+        # Load only the sheets the query needs from each workbook
+        dataframes, skipped = [], []
         for excel_content in excel_content_list:
-            # Read Excel content into DataFrame
-            excel_file = io.BytesIO(excel_content)
-            
-            # Read all sheets from the Excel file
-            excel_data = pd.read_excel(excel_file, sheet_name=None)
-            
-            # Combine all sheets into dataframes list
-            print(excel_data.items())
-            for sheet_name, df in excel_data.items():
-                df['source_sheet'] = sheet_name  # Add sheet name as a column
-                dataframes.append(df)
+            df, skipped_sheets = load_workbook_for_query(excel_content, query)
+            dataframes.append(df)
+            skipped.extend(skipped_sheets)
         
         # Combine all DataFrames
         if len(dataframes) > 1:
@@ -59,11 +281,15 @@ def process_excel_with_pandas_agent(excel_content_list: List[bytes], query: str)
             allow_dangerous_code=True
         )
         
-        # Run the query
+        # Run the query, telling the agent which sheets it cannot see
+        if skipped:
+            query = f"{query}\nnote: the dataframe only holds the sheets named in the question; these sheets were not loaded: {', '.join(map(str, skipped))}"
         response = agent.run(query)
         print("process end")
         return response
         
+    except Overloaded:
+        raise
     except Exception as e:
         print("process error")
         return f"Error processing Excel data: {str(e)}"
@@ -7,7 +7,10 @@ import io
 import os
 from typing import List, Dict, Union
 from collections import defaultdict
-from component.response import llm
+from component.response import llm, DOC_AGENT_PARAMS
+from component.llm_cache import cached_response
+from component.rate_limit import Overloaded
+from component.dataframe_cache import dataframe_cache
 
 class XMLProcessor:
     def __init__(self):
@@ -16,13 +19,16 @@ class XMLProcessor:
 
     def xml_to_dataframe(self, xml_content: str) -> pd.DataFrame:
         """
-        Convert XML content to pandas DataFrame
+        Convert XML content to pandas DataFrame, parsing each document once
         
         Args:
             xml_content: XML string content
         Returns:
             DataFrame representing the XML structure
         """
+        return dataframe_cache.get_or_build('xml', xml_content, lambda: self._parse_xml(xml_content))
+
+    def _parse_xml(self, xml_content: str) -> pd.DataFrame:
         try:
             # Parse XML content
             root = ET.fromstring(xml_content)
@@ -97,9 +103,12 @@ class XMLProcessor:
             response = agent.run(query)
             return response
             
+        except Overloaded:
+            raise
         except Exception as e:
             return f"Error processing XML data: {str(e)}"
 
+@cached_response('xml_agent', DOC_AGENT_PARAMS)
 def process_firebase_xml(blob_contents: List[str], query: str) -> str:
     """
     Process XML files from Firebase
@@ -113,5 +122,7 @@ def process_firebase_xml(blob_contents: List[str], query: str) -> str:
     try:
         processor = XMLProcessor()
         return processor.process_xml_data(blob_contents, query)
+    except Overloaded:
+        raise
     except Exception as e:
         return f"Error processing Firebase XML: {str(e)}"
@@ -1,26 +1,41 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import List, Optional
 import os
-import shutil
 from pydantic import BaseModel
 import time
 import requests
 import json
 import re
-import glob
 from fastapi.middleware.cors import CORSMiddleware
 import io
+import base64
+import asyncio
+from PIL import Image
+from langchain_core.messages import HumanMessage
 
 
 import warnings
 warnings.filterwarnings("ignore")
 
-from component.vectordb import create_vectorstore, append_PDFdata_vectorstore, retrieve_content, vector_store_to_retriever, delete_collection, metadata_retriever
-from component.response import doc_agent_response #  analyze_json, process_with_pandas_agent, process_firebase_response, process_firebase_xml, process_firebase_srt
-
-from component.firebase_fileUploads import create_folder_upload_files, retrieve_collection_from_firebase, retrieve_collection_name_from_firebase, retrieve_file_from_firebase
-from component.prompt import default_prompt, prompt_latex
+from component.vectordb import avector_store_to_retriever, aretrieve_content, ametadata_retriever, embeddings, embedding_store
+from component.indexer import index_collection, delete_index, rename_index, index_version
+from component.executors import run_blocking
+from component.response import adoc_agent_response, adoc_agent_stream #  analyze_json, process_with_pandas_agent, process_firebase_response, process_firebase_xml, process_firebase_srt
+
+from component.firebase_fileUploads import create_folder_upload_files, retrieve_collection_from_firebase, retrieve_collection_name_from_firebase, retrieve_file_from_firebase, list_collection_files, parse_cache, INDEXED_TYPES
+from component.prompt import default_prompt
+from component.latex_render import render_latex, submit_latex_job, latex_job_status, latex_cache, RENDERERS
+from component.llm_cache import response_cache
+from component.semantic_cache import semantic_cache, answer_scope
+from component.llm_clients import get_chat_model, chat_models, LLM_WARMUP_TIMEOUT
+from component.chat_history import compact_history
+from component.report import generate_chat_report
+from component.podcast_audio import stream_podcast_wav
+from component.dataframe_cache import dataframe_cache
+from component.singleflight import query_flights, request_key
+from component.rate_limit import llm_limiter, current_tenant, Overloaded
+from component.pdf_extract import backend_stats as pdf_backend_stats
 
 
 from agents.csv import process_with_pandas_agent
@@ -43,9 +58,31 @@ app.add_middleware(
 )
 
 
+IMGCHAT_MODEL= {'model': 'gemini-1.5-flash'}
+
+image_llm= get_chat_model(**IMGCHAT_MODEL)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("startup")
+async def warm_llm_clients():
+    # Open the shared clients' channels before the first request pays for it
+    try:
+        health= await asyncio.wait_for(run_blocking(chat_models.warm), LLM_WARMUP_TIMEOUT)
+        print(f"LLM clients warmed: {health}")
+    except asyncio.TimeoutError:
+        print(f"LLM client warmup did not finish within {LLM_WARMUP_TIMEOUT}s")
+
+
 
-def clean_latex(text):
-    return re.sub(r'```html', '```', text)
 
 
 
@@ -81,7 +118,7 @@ async def upload_files(
             
             file_path=f'users/{userID}/folders/{name}/{file.filename}'
 
-            test= create_folder_upload_files(file_path, file)
+            test= await run_blocking(create_folder_upload_files, file_path, file)
             
             # with open(file_path, "wb") as buffer:
             #     shutil.copyfileobj(file.file, buffer)
@@ -89,27 +126,15 @@ async def upload_files(
 
     
     
-    lst, data_type = retrieve_collection_from_firebase(f'{userID}/{name}/')
-    
     vec_name= rf'{userID}-{name}'
-    if data_type =='application/pdf':
-        vector_store = create_vectorstore(vec_name)
-        append_PDFdata_vectorstore(vector_store,lst)
-
-    elif data_type =='application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-        vector_store = create_vectorstore(vec_name)
-        append_PDFdata_vectorstore(vector_store,lst)
-
-    elif data_type =='text/plain':
-        vector_store = create_vectorstore(vec_name)
-        append_PDFdata_vectorstore(vector_store,lst)
+    await run_blocking(index_collection, vec_name, f'{userID}/{name}/')
 
     return JSONResponse(status_code=200, content={"message": "Files and links uploaded successfully."})
 
 @app.get("/collections/{uuid}")
 async def get_collections(uuid:str):
     path=f'{uuid}/folders/'
-    test_dir= retrieve_collection_name_from_firebase(path)
+    test_dir= await run_blocking(retrieve_collection_name_from_firebase, path)
     if len(test_dir)==0:
         return []
     
@@ -121,130 +146,297 @@ async def get_collections(uuid:str):
 
 
 
-@app.post("/folderandquery/{uuid}/{foldername}")
-async def query_the_agent(uuid:str, foldername:str, request:dict):
-    chat_history= request.get("chat_history")
-    user_prompt= request.get("prompt")
+async def run_data_agent(data_type, data_lst, query, chat_history):
+    # The pandas/JSON agents are synchronous, run them off the event loop
+    query= f"chat_history: {chat_history}\nquery: {query}"
 
-    print(user_prompt)
+    if data_type== 'application/json':
+        return await run_blocking(analyze_json, data_lst, query)
 
-    print(type(user_prompt))
+    elif data_type in ['application/octet-stream', 'application/x-subrip', 'text/srt']:
+        return await run_blocking(process_firebase_srt, data_lst, query)
 
-    data_lst, data_type = retrieve_collection_from_firebase(f'{uuid}/{foldername}/')
-    query = request.get("query")
-    
-    
-    
+    elif data_type== 'text/xml':
+        return await run_blocking(process_firebase_xml, data_lst, query)
+
+    elif data_type== 'text/csv':
+        return await run_blocking(process_with_pandas_agent, data_lst, query)
+
+    elif data_type in['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
+        return await run_blocking(process_firebase_response, data_lst, query)
+
+    raise HTTPException(status_code=400, detail=f"Unsupported file type: {data_type}")
+
+
+def resolve_prompt(user_prompt):
     if user_prompt!= "None":
-        prompt= user_prompt
-    else:
-        prompt= default_prompt
-        
+        return user_prompt
+    return default_prompt
+
+
+async def folder_data(uuid, foldername):
+    """
+    The folder's content type and, for the agent types only, its parsed files.
+    Indexed types are answered from Qdrant, so their folders are only listed.
+    """
+    folder_path= f'{uuid}/{foldername}/'
+    files= await run_blocking(list_collection_files, folder_path)
+    # Same rule as retrieve_collection_from_firebase: the last listed blob sets the type
+    data_type= next(reversed(files.values()))[1] if files else None
+    if data_type in INDEXED_TYPES:
+        return [], data_type
+    return await run_blocking(retrieve_collection_from_firebase, folder_path)
+
+
+async def folder_query_context(uuid, foldername, request):
+    """
+    Everything a folder query needs before generation: the request fields,
+    the folder's data, and for indexed types the retrieved chunk and its source.
+    """
+    data_lst, data_type = await folder_data(uuid, foldername)
+    ctx= {
+        'prompt': resolve_prompt(request.get("prompt")),
+        'chat_history': await compact_history(request.get("chat_history"), uuid, foldername, request.get("session_id")),
+        'query': request.get("query"),
+        'data_type': data_type,
+        'data_lst': data_lst,
+        'indexed': False,
+        'content': None,
+        'sources': {},
+        'suffix': '',
+        'latex': latex_options(request),
+        'cached': None,
+        'semantic': None,
+    }
 
-    
+    indexed_types= ['application/pdf','application/vnd.openxmlformats-officedocument.wordprocessingml.document','text/plain']
+    if data_type in indexed_types and await semantic_lookup(f'{uuid}-{foldername}', ctx):
+        return ctx
 
     if data_type in ['application/pdf','application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
         vec_name= f'{uuid}-{foldername}'
-        retriever= vector_store_to_retriever(vec_name)
-        content, filenameTest, foldernameTest, pnum=retrieve_content(retriever,query)
-        agent_response= doc_agent_response(prompt,content,chat_history, query)
-        response= f'{agent_response} \n filename:{filenameTest} \n foldername:{foldernameTest} \n page num:{pnum}'
-
-
+        retriever= await avector_store_to_retriever(vec_name)
+        content, filenameTest, foldernameTest, pnum= await aretrieve_content(retriever,ctx['query'])
+        ctx.update(
+            indexed=True,
+            content=content,
+            sources={'filename': filenameTest, 'foldername': foldernameTest, 'page_num': pnum},
+            suffix=f' \n filename:{filenameTest} \n foldername:{foldernameTest} \n page num:{pnum}',
+        )
 
     elif data_type== 'text/plain':
         vec_name= f'{uuid}-{foldername}'
-        retriever= vector_store_to_retriever(vec_name)
-        content, filenameTest, foldernameTest =retrieve_content(retriever,query)
-        agent_response= doc_agent_response(prompt,content,chat_history, query)
-        response= f'{agent_response} \n filename:{filenameTest} \n foldername:{foldernameTest}'
+        retriever= await avector_store_to_retriever(vec_name)
+        content, filenameTest, foldernameTest = await aretrieve_content(retriever,ctx['query'])
+        ctx.update(
+            indexed=True,
+            content=content,
+            sources={'filename': filenameTest, 'foldername': foldernameTest},
+            suffix=f' \n filename:{filenameTest} \n foldername:{foldernameTest}',
+        )
+
+    return ctx
+
+
+async def semantic_lookup(vec_name, ctx):
+    """
+    Serve a near-duplicate of an earlier question on this collection from the
+    semantic cache. The query embedding lands in the embedding cache, so the
+    retriever reuses it on a miss.
+    """
+    vector= await embeddings.aembed_query(ctx['query'])
+    version= await index_version(vec_name)
+    scope= answer_scope(ctx['prompt'], ctx['chat_history'])
+    ctx['semantic']= (vec_name, version, scope, vector)
+
+    cached= semantic_cache.lookup(vec_name, version, scope, vector)
+    if cached is None:
+        return False
+    ctx.update(indexed=True, cached=cached['response'], sources=cached['sources'])
+    return True
+
+
+def semantic_store(ctx, response):
+    if ctx['semantic'] and ctx['indexed']:
+        vec_name, version, scope, vector= ctx['semantic']
+        semantic_cache.store(vec_name, version, scope, vector, {'response': response, 'sources': ctx['sources']})
+
+
+async def file_query_context(uuid, foldername, filename, request):
+    try:
+        data_lst, data_type = await run_blocking(retrieve_file_from_firebase, f'{uuid}/{foldername}/{filename}')
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    ctx= {
+        'prompt': resolve_prompt(request.get("prompt")),
+        'chat_history': await compact_history(request.get("chat_history"), uuid, foldername, request.get("session_id")),
+        'query': request.get("query"),
+        'data_type': data_type,
+        'data_lst': data_lst,
+        'indexed': False,
+        'content': None,
+        'sources': {'filename': filename, 'foldername': foldername},
+        'suffix': '',
+        'latex': latex_options(request),
+        'cached': None,
+        'semantic': None,
+    }
 
-    elif data_type== 'application/json':
+    if data_type in ['application/pdf','application/vnd.openxmlformats-officedocument.wordprocessingml.document','text/plain']:
+        vec_name= f'{uuid}-{foldername}'
+        metadata_val= rf"{data_lst}"
 
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        
-        response= analyze_json(data_lst, query)
+        ctx['indexed']= True
+        ctx['content']= await ametadata_retriever(vec_name, metadata_val, ctx['query'])
 
-    elif data_type in ['application/octet-stream', 'application/x-subrip', 'text/srt']:
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_srt(data_lst, query)
+    return ctx
 
-    elif data_type== 'text/xml':
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_xml(data_lst, query)
 
-    elif data_type== 'text/csv':
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_with_pandas_agent(data_lst, query)
+async def answer_query(ctx):
+    if ctx['cached'] is not None:
+        return ctx['cached']
+    if ctx['indexed']:
+        agent_response= await adoc_agent_response(ctx['prompt'],ctx['content'],ctx['chat_history'], ctx['query'])
+        response= f"{agent_response}{ctx['suffix']}"
+        semantic_store(ctx, response)
+        return response
+    return await run_data_agent(ctx['data_type'], ctx['data_lst'], ctx['query'], ctx['chat_history'])
 
-    elif data_type in['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_response(data_lst, query)
-    
-    
-    
-   
-    inter_response= doc_agent_response(prompt_latex,response,'NONE', prompt_latex)
-    
-    clean_response= clean_latex(inter_response)
+
+def latex_options(request):
+    """
+    LaTeX/HTML rendering is opt-in per request:
+      render_latex: false (default) | true / "sync" | "async"
+      latex_renderer: "local" (default) | "llm"
+    """
+    mode= request.get("render_latex") or False
+    if mode is True:
+        mode= 'sync'
+    if mode not in [False, 'sync', 'async']:
+        raise HTTPException(status_code=400, detail=f"render_latex must be true, false, 'sync' or 'async', got {mode!r}")
+
+    renderer= request.get("latex_renderer") or 'local'
+    if renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"latex_renderer must be one of {RENDERERS}, got {renderer!r}")
+    return mode, renderer
+
+
+async def finalize_response(response, ctx):
     print(response)
-    return {"response":response, "response_latex": clean_response}
+    mode, renderer= ctx['latex']
+    if mode == 'sync':
+        return {"response":response, "response_latex": await render_latex(str(response), renderer)}
+    if mode == 'async':
+        return {"response":response, "response_latex": None, "latex_job": submit_latex_job(str(response), renderer)}
+    return {"response":response, "response_latex": None}
 
 
-@app.post("/fileandquery/{uuid}/{foldername}/{filename}")
-async def queryfile_the_agent(uuid:str, foldername:str, filename, request:dict):
-    user_prompt= request.get("prompt")
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-    data_lst, data_type = retrieve_file_from_firebase(f'{uuid}/{foldername}/{filename}')
-    query = request.get("query")
 
-    chat_history= request.get("chat_history")
+async def stream_query(ctx):
+    """
+    SSE body: a metadata event with the sources, token events as Gemini
+    generates, then a done event carrying the same payload as the JSON endpoints.
+    """
+    try:
+        yield sse_event('metadata', {'data_type': ctx['data_type'], **ctx['sources']})
+
+        if ctx['cached'] is not None:
+            response= ctx['cached']
+            yield sse_event('token', {'text': response})
+        elif ctx['indexed']:
+            parts= []
+            async for token in adoc_agent_stream(ctx['prompt'],ctx['content'],ctx['chat_history'], ctx['query']):
+                parts.append(token)
+                yield sse_event('token', {'text': token})
+            response= f"{''.join(parts)}{ctx['suffix']}"
+            semantic_store(ctx, response)
+        else:
+            response= await run_data_agent(ctx['data_type'], ctx['data_lst'], ctx['query'], ctx['chat_history'])
+            yield sse_event('token', {'text': response})
 
-    if user_prompt!= "None":
-        prompt= user_prompt
-    else:
-        prompt= default_prompt
-        
+        yield sse_event('done', await finalize_response(response, ctx))
 
-    if data_type in ['application/pdf','application/vnd.openxmlformats-officedocument.wordprocessingml.document','text/plain']:
-        vec_name= f'{uuid}-{foldername}'
-        metadata_val= rf"{data_lst}"
+    except Overloaded as e:
+        yield sse_event('error', {'detail': str(e), 'status': 503, 'retry_after': e.retry_after})
+    except Exception as e:
+        detail= e.detail if isinstance(e, HTTPException) else str(e)
+        yield sse_event('error', {'detail': detail})
 
-        
-        doc= metadata_retriever(vec_name, metadata_val, query)
-        response= doc_agent_response(prompt,doc,chat_history, query)
 
+def sse_response(ctx):
+    return StreamingResponse(
+        stream_query(ctx),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    elif data_type== 'application/json':
 
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        
-        response= analyze_json(data_lst, query)
+async def run_folder_query(uuid, foldername, request):
+    ctx= await folder_query_context(uuid, foldername, request)
+    response= await answer_query(ctx)
+    return await finalize_response(response, ctx)
 
-    elif data_type in ['application/octet-stream', 'application/x-subrip', 'text/srt']:
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_srt(data_lst, query)
 
-    elif data_type== 'text/xml':
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_xml(data_lst, query)
+async def run_file_query(uuid, foldername, filename, request):
+    ctx= await file_query_context(uuid, foldername, filename, request)
+    response= await answer_query(ctx)
+    return await finalize_response(response, ctx)
 
-    elif data_type== 'text/csv':
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_with_pandas_agent(data_lst, query)
 
-    elif data_type in['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
-        query= f"chat_history: {chat_history}\nquery: {query}"
-        response= process_firebase_response(data_lst, query)
-    
-    
-    
-   
-    inter_response= doc_agent_response(prompt_latex,response,'NONE', prompt_latex)
-    
-    clean_response= clean_latex(inter_response)
-    print(response)
-    return {"response":response, "response_latex": clean_response}
+@app.post("/folderandquery/{uuid}/{foldername}")
+async def query_the_agent(uuid:str, foldername:str, request:dict):
+    current_tenant.set(uuid)
+    # Identical concurrent requests share one computation
+    key= request_key('folderandquery', [uuid, foldername], request)
+    return await query_flights.do(key, lambda: run_folder_query(uuid, foldername, request), label=f'{uuid}/{foldername}')
+
+
+@app.post("/folderandquery/{uuid}/{foldername}/stream")
+async def stream_the_agent(uuid:str, foldername:str, request:dict):
+    current_tenant.set(uuid)
+    ctx= await folder_query_context(uuid, foldername, request)
+    return sse_response(ctx)
+
+
+@app.post("/fileandquery/{uuid}/{foldername}/{filename}")
+async def queryfile_the_agent(uuid:str, foldername:str, filename, request:dict):
+    current_tenant.set(uuid)
+    key= request_key('fileandquery', [uuid, foldername, filename], request)
+    return await query_flights.do(key, lambda: run_file_query(uuid, foldername, filename, request), label=f'{uuid}/{foldername}/{filename}')
+
+
+@app.post("/fileandquery/{uuid}/{foldername}/{filename}/stream")
+async def streamfile_the_agent(uuid:str, foldername:str, filename, request:dict):
+    current_tenant.set(uuid)
+    ctx= await file_query_context(uuid, foldername, filename, request)
+    return sse_response(ctx)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "llm_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "singleflight": query_flights.stats(),
+        "llm_limiter": llm_limiter.stats(),
+        "embedding_cache": embedding_store.stats(),
+        "parse_cache": parse_cache.stats(),
+        "latex_cache": latex_cache.stats(),
+        "dataframe_cache": dataframe_cache.stats(),
+        "pdf_backends": pdf_backend_stats(),
+    }
+
+
+@app.get("/latex/{job_id}")
+async def get_latex(job_id:str):
+    status= latex_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown LaTeX job {job_id}")
+    return status
 
 
 @app.delete("/collections/delete/{uuid}")
@@ -253,7 +445,7 @@ async def delete_data_collection(collection_name:dict, uuid:str):
         name= collection_name.get('name')
         vec_name= f'{uuid}-{name}'
         # test_path= os.path.join(uuid,name)
-        delete_collection(vec_name)
+        await run_blocking(delete_index, vec_name)
         return JSONResponse(status_code=200, content={"message": f"The collection {name} is deleted."})
     except Exception as e:
         return JSONResponse(status_code=400, content={'error':str(e)})
@@ -264,14 +456,48 @@ async def delete_data_collection(collection_name:dict, uuid:str):
 
 @app.post('/report')
 async def generate_report(request: dict):
-    prompt= 'You are provided with chat history'
-    query= 'write a through report summary of the chat'
-    content= request.get('chat')
-    response= doc_agent_response(prompt,content,'NONE', query)
+    current_tenant.set(request.get('uuid') or 'anonymous')
+    response= await generate_chat_report(request.get('chat'))
     return {"response": response}
 
+def clean_and_extract_json( text):
+    # First pattern to match and remove ```json or ```JSON and their closing ```
+    code_block_pattern = r'```(?:json|JSON)\n(.*?)```'
+
+    # Pattern to match "user_res: " prefix if it exists
+    prefix_pattern = r'^user_res:\s*'
+
+    def process_text(input_text):
+        # Remove prefix if it exists
+        text_without_prefix = re.sub(prefix_pattern, '', input_text.strip())
+
+        # Check if we have a code block
+        code_block_match = re.search(code_block_pattern, text_without_prefix, re.DOTALL)
+        if code_block_match:
+            # If we found a code block, return its contents
+            return code_block_match.group(1).strip()
+        else:
+            # If no code block markers, return the cleaned text
+            return text_without_prefix.strip()
+
+    return process_text(text)
+
+
+def parse_dialogue(transcript):
+    # The prompt's example uses r"..." strings, which the model sometimes copies
+    for candidate in [transcript, re.sub(r'(?<![\w"])r"', '"', transcript)]:
+        try:
+            dialogue= json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(dialogue, list) and all(isinstance(turn, dict) for turn in dialogue):
+            return dialogue
+    raise HTTPException(status_code=502, detail="Podcast transcript is not a JSON array of male/female lines")
+
+
 @app.post('/podcast')
 async def generate_podcast(request: dict):
+    current_tenant.set(request.get('uuid') or 'anonymous')
 
     prompt= 'You are provided with chat history '
     
@@ -304,33 +530,18 @@ async def generate_podcast(request: dict):
     '''
 
     # content= request.get('chat')
-    response= doc_agent_response(prompt,request.get('chat'),'NONE', query)
+    response= await adoc_agent_response(prompt,request.get('chat'),'NONE', query)
     
     
-    def clean_and_extract_json( text):
-    # First pattern to match and remove ```json or ```JSON and their closing ```
-        code_block_pattern = r'```(?:json|JSON)\n(.*?)```'
-
-        # Pattern to match "user_res: " prefix if it exists
-        prefix_pattern = r'^user_res:\s*'
-
-        def process_text(input_text):
-            # Remove prefix if it exists
-            text_without_prefix = re.sub(prefix_pattern, '', input_text.strip())
-
-            # Check if we have a code block
-            code_block_match = re.search(code_block_pattern, text_without_prefix, re.DOTALL)
-            if code_block_match:
-                # If we found a code block, return its contents
-                return code_block_match.group(1).strip()
-            else:
-                # If no code block markers, return the cleaned text
-                return text_without_prefix.strip()
-
-        return process_text(text)
-    
     response= clean_and_extract_json(response)
     print(response)
+
+    if request.get('audio'):
+        return StreamingResponse(
+            stream_podcast_wav(parse_dialogue(response)),
+            media_type="audio/wav",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     
     return {"response": response}
 
@@ -339,56 +550,14 @@ async def generate_podcast(request: dict):
 
 @app.post('/trigger/{uuid}/{old_folder_name}/{new_folder_name}')
 async def trigger_firebase(uuid: str, old_folder_name: str, new_folder_name: str):
-    # global vector_store
+    old_vec_name = f'{uuid}-{old_folder_name}'
+    new_vec_name = f'{uuid}-{new_folder_name}'
     try:
-        data_lst, data_type = retrieve_collection_from_firebase(f'{uuid}/{new_folder_name}/')
-        print(len(data_lst))
-        print(data_type)
-        if data_type in ['application/pdf', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain']:
-                old_vec_name = f'{uuid}-{old_folder_name}'
-                new_vec_name = f'{uuid}-{new_folder_name}'
-                
-                try:
-                    
-                    delete_collection(old_vec_name)
-                    time.sleep(2)
-                    
-                    
-                except Exception as e:
-                    print(f"Error deleting old collection: {e}")
-                
-                try:
-                    
-                    
-                    retries = 10
-                    for attempt in range(retries):
-                        vector_store = create_vectorstore(new_vec_name)
-                        
-                        collections = vector_store.client.get_collections()
-                        collection_names = [c.name for c in collections.collections]
-                        
-                        if new_vec_name in collection_names:
-                            break
-                        else:
-                            if attempt < retries - 1:
-                                print(f"Retrying collection creation check (Attempt {attempt + 1}/{retries})...")
-                                time.sleep(2)  # Wait for 2 seconds before retrying
-                            else:
-                                raise Exception(f"Collection {new_vec_name} was not created successfully")
-                    
-                    # Add a small delay to ensure the collection is fully created
-                    time.sleep(1)
-                    append_PDFdata_vectorstore(vector_store, data_lst)
-                    
-                    return {"status": "success", "message": "Vector store updated successfully"}
-                except Exception as e:
-                    print(f"Error in vector store operations: {e}")
-                    return {"status": "error", "message": str(e)}
-        else:
-            pass
-
-    except:
-        pass
+        await run_blocking(rename_index, old_vec_name, new_vec_name, f'{uuid}/{old_folder_name}/', f'{uuid}/{new_folder_name}/')
+        return {"status": "success", "message": "Vector store updated successfully"}
+    except Exception as e:
+        print(f"Error in vector store operations: {e}")
+        return {"status": "error", "message": str(e)}
 
 
 
@@ -419,7 +588,7 @@ async def api_connector(link: dict, uuid:str):
         raise HTTPException(status_code=400, detail="No link provided")
     
     try:
-        response = fetch_with_retry(url)
+        response = await run_blocking(fetch_with_retry, url)
         
         # Try to parse as JSON first
         try:
@@ -441,20 +610,10 @@ async def api_connector(link: dict, uuid:str):
     
 
 @app.post("/imgchat/{query}/{uuid}")
-async def ChatWithImg(query: str, file: UploadFile = File(...)):
-    from PIL import Image
-    import base64
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from dotenv import load_dotenv
-    from langchain_core.messages import HumanMessage
-
-    load_dotenv()
-
-
-    llm_key= os.getenv('LLM_KEY')
+async def ChatWithImg(query: str, uuid: str, file: UploadFile = File(...)):
+    current_tenant.set(uuid)
     contents = await file.read()
     image = Image.open(io.BytesIO(contents))
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", api_key=llm_key)
 
     def get_image_base64(image_raw):
         buffered = io.BytesIO()
@@ -466,7 +625,7 @@ async def ChatWithImg(query: str, file: UploadFile = File(...)):
         return base64.b64encode(file_bytes).decode('utf-8')
 
     image_base64 = get_image_base64(image)
-    response = model.invoke(
+    response = await image_llm.ainvoke(
         [
             HumanMessage(
                 content=[
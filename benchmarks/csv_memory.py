@@ -0,0 +1,114 @@
+"""
+Measured DataFrame memory and peak RSS of the CSV agent's compact parsing
+against a default pd.read_csv.
+
+Usage:
+    python -m benchmarks.csv_memory [--rows 1000000] [file.csv ...]
+
+Loads each CSV (or a generated one of --rows rows: ids, dates, floats and
+repetitive city/category strings) two ways, each in a fresh interpreter so
+ru_maxrss is its own peak:
+
+    default    pd.read_csv(io.StringIO(text)), as before the change
+    compact    read_csv_compact(raw bytes), pyarrow when installed
+
+and prints memory_usage(deep=True) of the resulting frame, load time and
+peak RSS. Importing agents.csv builds the agent's chat model, so LLM_KEY
+must be set; no model call is made.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+METHODS = ['default', 'compact']
+
+
+def write_csv(path, rows):
+    cities = ['Lagos', 'Nairobi', 'Accra', 'Cairo', 'Kigali', 'Dakar', 'Abuja', 'Kampala']
+    categories = ['grocery', 'fuel', 'transport', 'rent', 'utilities']
+    rng = random.Random(0)
+    with open(path, 'w') as f:
+        f.write('id,date,city,category,amount,quantity,note\n')
+        for row in range(rows):
+            f.write(f"{row},2024-{row % 12 + 1:02d}-{row % 28 + 1:02d},{rng.choice(cities)},{rng.choice(categories)},"
+                    f"{rng.random() * 1000:.2f},{rng.randint(1, 50)},order {row}\n")
+
+
+def _peak_rss_mb():
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_method(method, path):
+    """Runs in the child interpreter; prints one JSON line."""
+    import pandas as pd
+    from agents.csv import read_csv_compact
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    baseline = _peak_rss_mb()
+
+    started = time.perf_counter()
+    if method == 'default':
+        df = pd.read_csv(io.StringIO(raw.decode('utf-8')))
+    else:
+        df = read_csv_compact(raw)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'method': method,
+        'seconds': elapsed,
+        'rows': len(df),
+        'frame_mb': df.memory_usage(deep=True).sum() / 2**20,
+        'peak_rss_mb': _peak_rss_mb(),
+        'baseline_rss_mb': baseline,
+    }))
+
+
+def measure(method, path):
+    child = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.csv_memory', '--run', method, path],
+        capture_output=True, text=True,
+    )
+    if child.returncode:
+        raise RuntimeError(f"{method} failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='CSV files to load (default: generate one)')
+    parser.add_argument('--rows', type=int, default=1000000, help='rows of the generated CSV')
+    parser.add_argument('--run', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_method(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            path = os.path.join(tmp, 'benchmark.csv')
+            write_csv(path, args.rows)
+            files = [path]
+
+        print(f"{'file':<24} {'method':<8} {'seconds':>8} {'rows':>9} {'frame MB':>9} {'peak RSS MB':>12} {'over import MB':>15}")
+        for path in files:
+            name = f"{os.path.basename(path)} ({os.path.getsize(path) / 2**20:.0f} MB)"
+            for method in METHODS:
+                result = measure(method, path)
+                print(f"{name:<24} {result['method']:<8} {result['seconds']:>8.2f} {result['rows']:>9} {result['frame_mb']:>9.1f} "
+                      f"{result['peak_rss_mb']:>12.1f} {result['peak_rss_mb'] - result['baseline_rss_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Load time and peak RSS of the Excel agent's workbook loading against
+pd.read_excel, on a generated multi-sheet workbook.
+
+Usage:
+    python -m benchmarks.excel_load [--sheets 4] [--rows 240000] [--columns 10] [--workbook PATH]
+
+Writes a workbook of mixed numbers, dates and repetitive strings (the
+defaults give roughly 50MB of .xlsx), or uses --workbook. Each method then
+runs in a fresh interpreter so ru_maxrss is its own peak:
+
+    read_excel    pd.read_excel(sheet_name=None), every sheet
+    all_sheets    load_workbook_for_query with a question naming no sheet
+    one_sheet     load_workbook_for_query with a question naming the first sheet
+
+The DataFrame cache points at an empty directory for every run, so all
+three parse the workbook. Importing agents.xls builds the agent's chat
+model, so LLM_KEY must be set; no model call is made.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+METHODS = ['read_excel', 'all_sheets', 'one_sheet']
+
+
+def write_workbook(path, sheets, rows, columns):
+    import openpyxl
+
+    cities = ['Lagos', 'Nairobi', 'Accra', 'Cairo', 'Kigali', 'Dakar']
+    workbook = openpyxl.Workbook(write_only=True)
+    start = datetime.datetime(2020, 1, 1)
+    for sheet_idx in range(sheets):
+        sheet = workbook.create_sheet(f'Sheet{sheet_idx + 1}')
+        sheet.append(['id', 'date', 'city'] + [f'value_{c}' for c in range(columns - 3)])
+        for row in range(rows):
+            values = [row, start + datetime.timedelta(minutes=row), cities[row % len(cities)]]
+            values.extend(row * (c + 1) if c % 2 else row / (c + 1) for c in range(columns - 3))
+            sheet.append(values)
+    workbook.save(path)
+
+
+def _peak_rss_mb():
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_method(method, path):
+    """Runs in the child interpreter; prints one JSON line."""
+    import pandas as pd
+    from agents.xls import load_workbook_for_query, sheet_catalog
+
+    with open(path, 'rb') as f:
+        raw = f.read()
+    baseline = _peak_rss_mb()
+
+    started = time.perf_counter()
+    if method == 'read_excel':
+        frames = pd.read_excel(io.BytesIO(raw), sheet_name=None)
+        rows = sum(len(df) for df in frames.values())
+        frame_mb = sum(df.memory_usage(deep=True).sum() for df in frames.values()) / 2**20
+    else:
+        first = sheet_catalog(raw)[0]['name']
+        question = f"what is the mean of value_1 in the {first} sheet" if method == 'one_sheet' else "what is the mean of value_1"
+        df, _ = load_workbook_for_query(raw, question)
+        rows = len(df)
+        frame_mb = df.memory_usage(deep=True).sum() / 2**20
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'method': method,
+        'seconds': elapsed,
+        'rows': rows,
+        'frame_mb': frame_mb,
+        'peak_rss_mb': _peak_rss_mb(),
+        'baseline_rss_mb': baseline,
+    }))
+
+
+def measure(method, path):
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env['DATAFRAME_CACHE_DIR'] = cache_dir
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.excel_load', '--run', method, path],
+            env=env, capture_output=True, text=True,
+        )
+    if child.returncode:
+        raise RuntimeError(f"{method} failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sheets', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=240000, help='rows per sheet')
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--workbook', help='use this workbook instead of generating one')
+    parser.add_argument('--run', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_method(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.workbook
+        if path is None:
+            path = os.path.join(tmp, 'benchmark.xlsx')
+            started = time.perf_counter()
+            write_workbook(path, args.sheets, args.rows, max(args.columns, 4))
+            print(f"Generated {path}: {args.sheets} sheets x {args.rows} rows in {time.perf_counter() - started:.1f}s")
+        print(f"Workbook size: {os.path.getsize(path) / 2**20:.1f} MB")
+
+        print(f"{'method':<11} {'seconds':>8} {'rows':>9} {'frame MB':>9} {'peak RSS MB':>12} {'over import MB':>15}")
+        for method in METHODS:
+            result = measure(method, path)
+            print(f"{result['method']:<11} {result['seconds']:>8.2f} {result['rows']:>9} {result['frame_mb']:>9.1f} "
+                  f"{result['peak_rss_mb']:>12.1f} {result['peak_rss_mb'] - result['baseline_rss_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
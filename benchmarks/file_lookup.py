@@ -0,0 +1,74 @@
+"""
+Per-file lookup latency of retrieve_file_from_firebase against the folder
+listing it replaced, across folders of different sizes.
+
+Usage:
+    python -m benchmarks.file_lookup [--runs N] uuid/folder/filename [uuid/folder/filename ...]
+
+Pass one file from each of several folders of increasing size (e.g. 10, 50
+and 200 files). The legacy lookup listed the folder and downloaded every blob
+up to the requested one, so its latency grows with the folder; the direct
+lookup fetches one blob's metadata and should stay flat. Use PDF, DOCX or TXT
+files: for the agent types the direct lookup also downloads the blob, and
+serves later runs from the parse cache. Runs against the bucket configured in
+component.firebase_fileUploads.
+"""
+import argparse
+import statistics
+import time
+
+from component.firebase_fileUploads import bucket, retrieve_file_from_firebase
+
+
+def _folder_prefix(file_path):
+    parts= file_path.split('/')
+    return f"users/{parts[0]}/folders/{parts[1]}/", parts[2]
+
+
+def legacy_lookup(file_path):
+    # The pre-get_blob behaviour: list the folder, download each blob, then compare names
+    prefix, file_name= _folder_prefix(file_path)
+    for blob in bucket.list_blobs(prefix= prefix):
+        if blob.name == f'{prefix}_.pdf':
+            continue
+        blob.download_as_bytes()
+        if blob.name == f'{prefix}{file_name}':
+            return blob.name, blob.content_type
+    raise FileNotFoundError(f'{prefix}{file_name} does not exist')
+
+
+def direct_lookup(file_path):
+    return retrieve_file_from_firebase(file_path)
+
+
+def measure(lookup, file_path, runs):
+    timings= []
+    for _ in range(runs):
+        started= time.perf_counter()
+        lookup(file_path)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'mean': statistics.fmean(timings),
+    }
+
+
+def main():
+    parser= argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+', help='files to look up, as uuid/folder/filename')
+    parser.add_argument('--runs', type=int, default=10, help='lookups per file and method (default: 10)')
+    args= parser.parse_args()
+
+    print(f"{'folder files':>12}  {'method':<7} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}  file")
+    for file_path in args.files:
+        prefix, _= _folder_prefix(file_path)
+        folder_size= sum(1 for _ in bucket.list_blobs(prefix= prefix))
+        for method, lookup in (('legacy', legacy_lookup), ('direct', direct_lookup)):
+            result= measure(lookup, file_path, args.runs)
+            print(f"{folder_size:>12}  {method:<7} {result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} {result['mean'] * 1000:>9.1f}  {file_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Concurrent load test of the query endpoints on a running server.
+
+Usage:
+    uvicorn app.server:app --workers 1
+    python -m benchmarks.load_test --url http://localhost:8000 --uuid U --folder F \\
+        [--file NAME] [--concurrency 1 4 16] [--requests 64] [--queries queries.txt]
+
+For each concurrency level, sends --requests POSTs to /folderandquery (or
+/fileandquery with --file), at most that many in flight, and reports
+throughput, p50/p95 latency and failures. With a blocking event loop,
+throughput stays flat as concurrency grows; with the async pipeline it should
+rise until the LLM limiter or Gemini quota caps it. To compare before and
+after, run it against a server started from each revision.
+
+Repeated queries are answered by the response and semantic caches and
+collapsed by singleflight, which measures the caches rather than the
+pipeline: pass a --queries file with at least --requests distinct lines.
+Uses only the standard library, so it runs from any environment.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def endpoint(args):
+    if args.file:
+        return f"{args.url.rstrip('/')}/fileandquery/{args.uuid}/{args.folder}/{args.file}"
+    return f"{args.url.rstrip('/')}/folderandquery/{args.uuid}/{args.folder}"
+
+
+def post(url, query, timeout):
+    body= json.dumps({'query': query, 'chat_history': [], 'prompt': 'None'}).encode('utf-8')
+    request= urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+    started= time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status= response.status
+    except urllib.error.HTTPError as e:
+        status= e.code
+    except (urllib.error.URLError, TimeoutError) as e:
+        status= type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def run_level(url, queries, concurrency, total, timeout):
+    started= time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results= list(executor.map(lambda i: post(url, queries[i % len(queries)], timeout), range(total)))
+    elapsed= time.perf_counter() - started
+
+    latencies= sorted(latency for status, latency in results if status == 200)
+    failures= {}
+    for status, _ in results:
+        if status != 200:
+            failures[status]= failures.get(status, 0) + 1
+    return {
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': statistics.median(latencies) if latencies else None,
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        'ok': len(latencies),
+        'failures': failures,
+    }
+
+
+def main():
+    parser= argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--uuid', required=True)
+    parser.add_argument('--folder', required=True)
+    parser.add_argument('--file', help='query one file through /fileandquery instead of the folder')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=64, help='requests per concurrency level (default: 64)')
+    parser.add_argument('--queries', help='file with one query per line, cycled through')
+    parser.add_argument('--timeout', type=float, default=120)
+    args= parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, 'r') as f:
+            queries= [line.strip() for line in f if line.strip()]
+    else:
+        queries= [f'Summarize the documents, part {i}' for i in range(args.requests)]
+        print("Generated queries differ only by a number and may be answered by the semantic cache; pass --queries to measure the pipeline")
+    if len(queries) < args.requests:
+        print(f"Only {len(queries)} distinct queries for {args.requests} requests; repeats will hit the caches")
+
+    url= endpoint(args)
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'ok':>5}  failures")
+    for concurrency in args.concurrency:
+        result= run_level(url, queries, concurrency, args.requests, args.timeout)
+        p50= f"{result['p50']:.2f}" if result['p50'] is not None else '-'
+        p95= f"{result['p95']:.2f}" if result['p95'] is not None else '-'
+        print(f"{concurrency:>11} {result['throughput']:>8.2f} {p50:>8} {p95:>8} {result['ok']:>5}  {result['failures'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
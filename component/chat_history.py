@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+
+from component.cache import DiskCache
+from component.prompt import prompt_history_summary
+from component.response import adoc_agent_response
+
+
+# Histories above the budget keep their last turns verbatim and fold everything
+# older into a rolling summary stored per (uuid, folder, session).
+CHAT_HISTORY_TOKEN_BUDGET= max(2, int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', 2000)))
+CHAT_HISTORY_KEEP_TURNS= int(os.getenv('CHAT_HISTORY_KEEP_TURNS', 6))
+CHAT_SUMMARY_TOKEN_BUDGET= int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', 400))
+if not 0 < CHAT_SUMMARY_TOKEN_BUDGET < CHAT_HISTORY_TOKEN_BUDGET:
+    # The summary has to leave part of the history budget for the verbatim turns
+    clamped= max(1, min(CHAT_SUMMARY_TOKEN_BUDGET, CHAT_HISTORY_TOKEN_BUDGET // 2))
+    print(f"CHAT_SUMMARY_TOKEN_BUDGET={CHAT_SUMMARY_TOKEN_BUDGET} does not fit in CHAT_HISTORY_TOKEN_BUDGET={CHAT_HISTORY_TOKEN_BUDGET}, using {clamped}")
+    CHAT_SUMMARY_TOKEN_BUDGET= clamped
+CHAT_SUMMARY_DIR= os.getenv('CHAT_SUMMARY_DIR', './cache/chat_summaries')
+CHAT_SUMMARY_MAX_BYTES= int(os.getenv('CHAT_SUMMARY_MAX_BYTES', 64 * 1024 * 1024))
+
+summary_store= DiskCache(CHAT_SUMMARY_DIR, CHAT_SUMMARY_MAX_BYTES)
+
+
+def estimate_tokens(text):
+    # Gemini averages about four characters per token on English text
+    return len(text) // 4 + 1
+
+
+def split_turns(chat_history):
+    if isinstance(chat_history, list):
+        return [turn if isinstance(turn, str) else json.dumps(turn, default=str) for turn in chat_history]
+    return [line for line in str(chat_history).splitlines() if line.strip()]
+
+
+def _digest(turns):
+    return hashlib.sha256(json.dumps(turns).encode('utf-8')).hexdigest()
+
+
+async def _summarize(previous, turns):
+    content= f"Summary so far: {previous or 'NONE'}\n\nLater turns:\n" + '\n'.join(turns)
+    query= f'Write the merged summary in at most {CHAT_SUMMARY_TOKEN_BUDGET * 3 // 4} words.'
+    summary= await adoc_agent_response(prompt_history_summary, content, 'NONE', query)
+    return str(summary).strip()[:CHAT_SUMMARY_TOKEN_BUDGET * 4]
+
+
+async def compact_history(chat_history, uuid, folder, session_id=None):
+    """
+    Bound the chat history sent to the model by CHAT_HISTORY_TOKEN_BUDGET.
+
+    Histories within budget are returned unchanged. Otherwise the last
+    CHAT_HISTORY_KEEP_TURNS turns stay verbatim and older turns are replaced by
+    the session's rolling summary; only turns the stored summary does not yet
+    cover are sent for summarization.
+
+    Args:
+        chat_history: list of turns or newline separated string, as sent by the client
+        uuid, folder: the folder being queried
+        session_id: client session, one rolling summary per session
+    Returns:
+        the history, or a compacted string of summary plus recent turns
+    """
+    if not chat_history:
+        return chat_history
+
+    turns= split_turns(chat_history)
+    if estimate_tokens('\n'.join(turns)) <= CHAT_HISTORY_TOKEN_BUDGET:
+        return chat_history
+
+    verbatim_budget= max(1, CHAT_HISTORY_TOKEN_BUDGET - CHAT_SUMMARY_TOKEN_BUDGET)
+    keep= min(CHAT_HISTORY_KEEP_TURNS, len(turns))
+    while keep > 1 and estimate_tokens('\n'.join(turns[-keep:])) > verbatim_budget:
+        keep-= 1
+    older, recent= turns[:-keep], turns[-keep:]
+
+    if estimate_tokens(recent[0]) > verbatim_budget:
+        # A single turn larger than the budget keeps its most recent part
+        recent[0]= recent[0][-verbatim_budget * 4:]
+
+    if not older:
+        return '\n'.join(recent)
+
+    key= f'{uuid}/{folder}/{session_id or "default"}'
+    stored= summary_store.get(key)
+    if stored and stored['covered'] <= len(older) and stored['digest'] == _digest(older[:stored['covered']]):
+        summary, covered= stored['summary'], stored['covered']
+    else:
+        # New session, or the client rewrote earlier turns
+        summary, covered= None, 0
+
+    if covered < len(older):
+        summary= await _summarize(summary, older[covered:])
+        summary_store.set(key, {'covered': len(older), 'digest': _digest(older), 'summary': summary})
+
+    return '\n'.join([f'Summary of earlier conversation: {summary}', *recent])
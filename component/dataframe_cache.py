@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+# Parsed DataFrames of tabular blobs, keyed by a hash of the raw content: an
+# in-memory LRU bounded by bytes, backed by Arrow IPC files that are
+# memory-mapped on load. Without pyarrow only the memory tier is used.
+DATAFRAME_CACHE_DIR= os.getenv('DATAFRAME_CACHE_DIR', './cache/dataframes')
+DATAFRAME_CACHE_MAX_BYTES= int(os.getenv('DATAFRAME_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+DATAFRAME_MEMORY_MAX_BYTES= int(os.getenv('DATAFRAME_MEMORY_MAX_BYTES', 512 * 1024 * 1024))
+
+
+def content_digest(content):
+    raw= content.encode('utf-8') if isinstance(content, str) else bytes(content)
+    return hashlib.sha256(raw).hexdigest()
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class DataFrameCache:
+    def __init__(self, directory, max_bytes, memory_max_bytes):
+        self.directory= directory
+        self.max_bytes= max_bytes
+        self.memory_max_bytes= memory_max_bytes
+        self.memory_hits= 0
+        self.disk_hits= 0
+        self.misses= 0
+        self._frames= OrderedDict()
+        self._memory_bytes= 0
+        self._lock= threading.Lock()
+        if pa is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.arrow')
+
+    def _remember(self, key, df):
+        size= frame_bytes(df)
+        if size > self.memory_max_bytes:
+            return
+        with self._lock:
+            previous= self._frames.pop(key, None)
+            if previous is not None:
+                self._memory_bytes-= previous[1]
+            self._frames[key]= (df, size)
+            self._memory_bytes+= size
+            while self._memory_bytes > self.memory_max_bytes:
+                _, (_, evicted)= self._frames.popitem(last=False)
+                self._memory_bytes-= evicted
+
+    def _load(self, key):
+        if pa is None:
+            return None
+        try:
+            with pa.memory_map(self._path(key), 'r') as source:
+                df= pa.ipc.open_file(source).read_all().to_pandas()
+            os.utime(self._path(key))
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        return df
+
+    def _persist(self, key, df):
+        if pa is None:
+            return
+        try:
+            table= pa.Table.from_pandas(df, preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError) as e:
+            # Mixed-type object columns have no Arrow type; keep them in memory only
+            print(f"DataFrame cache: not persisting {key[:12]}: {e}")
+            return
+
+        path= self._path(key)
+        tmp_path= f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException) as e:
+            print(f"DataFrame cache: failed to write {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries= []
+        for name in os.listdir(self.directory):
+            if name.endswith('.arrow'):
+                try:
+                    stat= os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total= sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total-= size
+
+    def get_or_build(self, kind, content, build, digest=None):
+        """
+        The DataFrame for a blob's raw content, parsed by build() on a miss.
+        Callers that already hashed the content pass its content_digest().
+
+        Returns a copy: the pandas agents run generated code that may modify
+        the frame in place.
+        """
+        digest= digest or content_digest(content)
+        key= hashlib.sha256(f'{kind}\0{digest}'.encode('utf-8')).hexdigest()
+
+        with self._lock:
+            entry= self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.memory_hits+= 1
+                return entry[0].copy()
+
+        df= self._load(key)
+        if df is not None:
+            with self._lock:
+                self.disk_hits+= 1
+        else:
+            df= build()
+            with self._lock:
+                self.misses+= 1
+            self._persist(key, df)
+
+        self._remember(key, df)
+        return df.copy()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_frames': len(self._frames),
+                'memory_bytes': self._memory_bytes,
+                'memory_max_bytes': self.memory_max_bytes,
+                'disk': pa is not None,
+            }
+
+
+dataframe_cache= DataFrameCache(DATAFRAME_CACHE_DIR, DATAFRAME_CACHE_MAX_BYTES, DATAFRAME_MEMORY_MAX_BYTES)
@@ -0,0 +1,20 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Blocking work called from async handlers (Firebase storage, pandas agents,
+# index maintenance) runs here so it never stalls the event loop. Bounded so a
+# burst of slow calls queues instead of spawning unbounded threads.
+BLOCKING_WORKERS= int(os.getenv('BLOCKING_WORKERS', 32))
+
+blocking_executor= ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix='blocking')
+
+
+async def run_blocking(fn, *args, **kwargs):
+    loop= asyncio.get_running_loop()
+    # Like asyncio.to_thread, carry the caller's context variables into the worker
+    ctx= contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, functools.partial(ctx.run, fn, *args, **kwargs))
@@ -0,0 +1,75 @@
+import io
+import json
+
+from langchain.docstore.document import Document
+from docx import Document as DocxDocument
+
+from component.pdf_extract import extract_pdf_documents
+
+
+EXCEL_TYPES = ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']
+SRT_TYPES = ['application/octet-stream', 'application/x-subrip', 'text/srt']
+
+# Types whose extraction is CPU-bound and worth shipping to a worker process.
+# PDFs also go to the pool, whole or split into page ranges (see pdf_extract.should_split).
+CPU_BOUND_TYPES = ['application/vnd.openxmlformats-officedocument.wordprocessingml.document']
+
+
+def parse_blob_content(blob_name, content_type, content):
+    """
+    Parse the raw bytes of a Firebase blob into the items the query path consumes.
+
+    Args:
+        blob_name: Full blob name (users/{uuid}/folders/{folder}/{file})
+        content_type: Blob content type
+        content: Raw blob bytes
+    Returns:
+        List of parsed items (Documents, dicts, strings or bytes depending on type)
+    """
+    result = []
+
+    if content_type == 'application/pdf':
+        result.extend(extract_pdf_documents(blob_name, content))
+
+    elif content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+        # Process DOCX file
+        docx_file = io.BytesIO(content)
+        docx_document = DocxDocument(docx_file)
+        docx_text = ''
+        for para in docx_document.paragraphs:
+            if para.text:
+                docx_text += para.text + '\n'
+
+        doc = Document(page_content=docx_text, metadata={"filename": blob_name})
+        result.append(doc)
+
+    elif content_type == 'text/plain':
+        # Process TXT file
+        txt_content = content.decode('utf-8')
+
+        doc = Document(page_content=txt_content, metadata={"filename": blob_name})
+        result.append(doc)
+
+    elif content_type == 'application/json':
+        reader = content.decode('utf-8')
+        json_file = json.loads(reader)
+        parts = blob_name.split('/')
+        data = {parts[2]: json_file}
+        result.append(data)
+
+    elif content_type == 'text/csv':
+        # Kept as bytes: the CSV agent parses straight from them
+        result.append(content)
+
+    elif content_type in EXCEL_TYPES:  # for xls, xlsx
+        result.append(content)
+
+    elif content_type == 'text/xml':
+        xml_content = content.decode('utf-8')
+        result.append(xml_content)
+
+    elif content_type in SRT_TYPES:
+        srt_content = content.decode('utf-8')
+        result.append(srt_content)
+
+    return result
@@ -3,11 +3,13 @@ from firebase_admin import credentials, storage, firestore
 from google.cloud.firestore_v1.base_query import FieldFilter, Or
 import json
 import os
-import io
-from PyPDF2 import PdfReader
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed
+import threading
+import multiprocessing
 
-from langchain.docstore.document import Document
-from docx import Document as DocxDocument
+from component.cache import DiskCache
+from component.file_parsers import parse_blob_content, CPU_BOUND_TYPES
+from component.pdf_extract import extract_pdf_documents, should_split
 
 
 
@@ -51,6 +53,35 @@ app = firebase_admin.initialize_app(cred, {
 bucket= storage.bucket(app= app)
 
 
+# Parsed blob contents, keyed by blob name + generation + md5 from the listing
+PARSE_CACHE_DIR= os.getenv('PARSE_CACHE_DIR', './cache/parsed')
+PARSE_CACHE_MAX_BYTES= int(os.getenv('PARSE_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+parse_cache= DiskCache(PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES)
+
+
+# Folder ingestion concurrency: blob downloads are I/O-bound and run on threads,
+# PDF/DOCX extraction is CPU-bound and runs on a process pool.
+FIREBASE_DOWNLOAD_WORKERS= int(os.getenv('FIREBASE_DOWNLOAD_WORKERS', 8))
+FIREBASE_PARSE_WORKERS= int(os.getenv('FIREBASE_PARSE_WORKERS', os.cpu_count() or 1))
+
+download_executor= ThreadPoolExecutor(max_workers=FIREBASE_DOWNLOAD_WORKERS, thread_name_prefix='firebase-download')
+
+_parse_executor= None
+_parse_executor_lock= threading.Lock()
+
+
+def get_parse_executor():
+    # Created lazily so importing this module does not fork worker processes
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            # forkserver: by now the process has thread pools and gRPC channels, and a
+            # plain fork would copy locks other threads hold into the workers
+            _parse_executor= ProcessPoolExecutor(max_workers=FIREBASE_PARSE_WORKERS, mp_context=multiprocessing.get_context('forkserver'))
+        return _parse_executor
+
+
 
 
 
@@ -86,99 +117,95 @@ def retrieve_collection_name_from_firebase(path):
         print('why')
         raise e
    
-def retrieve_collection_from_firebase(folder_path):
+def _parse_cache_key(blob):
+    # generation changes on every overwrite, md5 guards against re-uploads of the same name
+    return f'{blob.name}:{blob.generation}:{blob.md5_hash}'
+
+
+def _fetch_blob(blob):
+    key= _parse_cache_key(blob)
+    items= parse_cache.get(key)
+    if items is not None:
+        return items, None
+    return None, blob.download_as_bytes()
+
+
+def _parse_and_cache(blob, content):
+    items= parse_blob_content(blob.name, blob.content_type, content)
+    parse_cache.set(_parse_cache_key(blob), items)
+    return items
+
+
+def list_collection_files(folder_path):
+    """
+    List a folder without downloading anything.
+
+    Returns:
+        dict mapping blob name to (md5_hash, content_type)
+    """
+    parts = folder_path.split('/')
+    folder_path= f"users/{parts[0]}/folders/{parts[1]}/"
+
+    return {
+        blob.name: (blob.md5_hash, blob.content_type)
+        for blob in bucket.list_blobs(prefix= folder_path)
+        if blob.name!=f'{folder_path}_.pdf'
+    }
+
+
+def retrieve_collection_from_firebase(folder_path, filenames=None):
     try:
         parts = folder_path.split('/')
         #test_path=f'users/folders/{folder_path}'
         # users/{id}/folders/{folder_names}/{files}
         folder_path= f"users/{parts[0]}/folders/{parts[1]}/"
 
-        print
+        blobs= [blob for blob in bucket.list_blobs(prefix= folder_path) if blob.name!=f'{folder_path}_.pdf']
+        if filenames is not None:
+            filenames= set(filenames)
+            blobs= [blob for blob in blobs if blob.name in filenames]
+        if not blobs:
+            return [], None
+
+        # Stage 1: download on threads. Stage 2: PDF pages and DOCX parsing on processes,
+        # lighter types inline. Results are collected by listing index so the
+        # output order matches the listing regardless of completion order.
+        fetch_futures= {download_executor.submit(_fetch_blob, blob): idx for idx, blob in enumerate(blobs)}
+        parsed= [None] * len(blobs)
+        for future in as_completed(fetch_futures):
+            idx= fetch_futures[future]
+            blob= blobs[idx]
+            items, content= future.result()
+            if items is not None:
+                parsed[idx]= items
+            elif blob.content_type == 'application/pdf' and should_split(content):
+                # Coordinated from a thread, page ranges fan out across the process pool
+                parsed[idx]= download_executor.submit(extract_pdf_documents, blob.name, content, get_parse_executor())
+            elif blob.content_type == 'application/pdf':
+                # Small PDFs are parsed whole in one worker process
+                parsed[idx]= get_parse_executor().submit(extract_pdf_documents, blob.name, content)
+            elif blob.content_type in CPU_BOUND_TYPES:
+                parsed[idx]= get_parse_executor().submit(parse_blob_content, blob.name, blob.content_type, content)
+            else:
+                parsed[idx]= _parse_and_cache(blob, content)
 
-        blobs= bucket.list_blobs(prefix= folder_path)
-        
         result=[]
-        for blob in blobs:
-            # print(f'{folder_path}_.pdf')
-            # arr= np.frombuffer(blob.download_as_string(), np.uint8)
-            if blob.name==f'{folder_path}_.pdf':
-                continue
-            content= blob.download_as_bytes()
-            file_type= blob.content_type
-            
-            if blob.content_type=='application/pdf':
-                
-                pdf_file= io.BytesIO(content)
-                reader= PdfReader(pdf_file) 
-                #pdf_text=''
-                for pnum, page in enumerate(reader.pages, start=1):
-                    pdf_text = page.extract_text()
-
-                    doc = Document(page_content=pdf_text, metadata={"filename": blob.name, 'page number':pnum})
-                    result.append(doc)
-                
-
-            elif blob.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                # Process DOCX file
-                docx_file = io.BytesIO(content)
-                docx_document = DocxDocument(docx_file)
-                docx_text = ''
-                for para in docx_document.paragraphs:
-                    if para.text:
-                        docx_text += para.text + '\n'
-
-                
-                doc = Document(page_content=docx_text, metadata={"filename": blob.name})
-                result.append(doc)
-                
-
-            elif blob.content_type == 'text/plain':
-                # Process TXT file
-                txt_content = content.decode('utf-8')
-                
-                doc = Document(page_content=txt_content, metadata={"filename": blob.name})
-                result.append(doc)
-
-
-            elif blob.content_type=='application/json':
-                reader= content.decode('utf-8')
-                json_file= json.loads(reader)
-                path= blob.name
-                parts = path.split('/')
-                data= {parts[2]:json_file}
-                result.append(data)
-
-            elif blob.content_type == 'text/csv':
-                #content = blob.download_as_bytes()
-                csv_content = content.decode('utf-8')
-                result.append(csv_content)
-
-            elif blob.content_type in  ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']: # for xls, xlsx
-                #content = blob.download_as_bytes()
-                print("type correct")
-                result.append(content)
-
-            elif blob.content_type == 'text/xml':
-                # Process TXT file
-                xml_content = content.decode('utf-8')
-                
-                # doc = Document(page_content=txt_content, metadata={"filename": blob.name})
-                result.append(xml_content)
-
-            elif blob.content_type in ['application/octet-stream', 'application/x-subrip', 'text/srt']:
-                # Process TXT file
-                srt_content = content.decode('utf-8')
-                
-                # doc = Document(page_content=txt_content, metadata={"filename": blob.name})
-                result.append(srt_content)
-            
+        for blob, items in zip(blobs, parsed):
+            if isinstance(items, Future):
+                items= items.result()
+                parse_cache.set(_parse_cache_key(blob), items)
+            result.extend(items)
 
-        return result, file_type
+        return result, blobs[-1].content_type
             
     except Exception as e:
         raise e
 
 
+# Types the query path serves from Qdrant; only the blob name is needed for them
+INDEXED_TYPES = ['application/pdf', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain']
+
+
 def retrieve_file_from_firebase(folder_path):
     try:
         parts = folder_path.split('/')
@@ -187,78 +214,24 @@ def retrieve_file_from_firebase(folder_path):
 
         file_name= parts[2]
 
-        blobs= bucket.list_blobs(prefix= file_path)
-        
+        # get_blob only fetches the object's metadata, not its content
+        blob= bucket.get_blob(f"{file_path}{file_name}")
+        if blob is None:
+            raise FileNotFoundError(f"{file_path}{file_name} does not exist")
 
-        
-        result=[]
-        for blob in blobs:
-            
-            if blob.name==f'{folder_path}_.pdf':
-                continue
+        file_type= blob.content_type
+        if file_type in INDEXED_TYPES:
+            return blob.name, file_type
+
+        key= _parse_cache_key(blob)
+        result= parse_cache.get(key)
+        if result is None:
             content= blob.download_as_bytes()
-            file_type= blob.content_type
-            
-            if blob.content_type=='application/pdf':
-                
-                if blob.name== f"{file_path}{file_name}":
-                    return blob.name, file_type
-                
-
-            elif blob.content_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-                # Process DOCX file
-                if blob.name== f"{file_path}{file_name}":
-                    return blob.name, file_type
-                
-
-            elif blob.content_type == 'text/plain':
-                # Process TXT file
-                if blob.name== f"{file_path}{file_name}":
-                    return blob.name, file_type
-
-            elif blob.content_type=='application/json':
-                if blob.name== f"{file_path}{file_name}":
-                    reader= content.decode('utf-8')
-                    json_file= json.loads(reader)
-                    path= blob.name
-                    parts = path.split('/')
-                    data= {parts[2]:json_file}
-                    result.append(data)
-
-            elif blob.content_type == 'text/csv':
-                if blob.name== f"{file_path}{file_name}":
-                    csv_content = content.decode('utf-8')
-                    result.append(csv_content)
-
-            elif blob.content_type in  ['application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']: # for xls, xlsx
-                if blob.name== f"{file_path}{file_name}":
-                    print(f"{file_path}{file_name}")
-                    print(f"blob.name: {blob.name}")
-                    print("type correct")
-                    result.append(content)
-
-            elif blob.content_type == 'text/xml':
-                if blob.name== f"{file_path}{file_name}":
-                    print(f"{file_path}{file_name}")
-                    print(f"blob.name: {blob.name}")
-                    xml_content = content.decode('utf-8')
-                    
-                    # doc = Document(page_content=txt_content, metadata={"filename": blob.name})
-                    result.append(xml_content)
-
-            elif blob.content_type in ['application/octet-stream', 'application/x-subrip', 'text/srt']:
-                if blob.name== f"{file_path}{file_name}":
-                    srt_content = content.decode('utf-8')
-                    
-                    # doc = Document(page_content=txt_content, metadata={"filename": blob.name})
-                    result.append(srt_content)
-            
+            result= parse_blob_content(blob.name, file_type, content)
+            parse_cache.set(key, result)
 
         return result, file_type
-            # break
-        
-            # print(arr)
+
     except Exception as e:
         raise e
 
-
@@ -0,0 +1,150 @@
+import json
+import os
+import uuid
+
+from component.vectordb import create_vectorstore, append_PDFdata_vectorstore, delete_file_points, delete_collection, rename_collection, index_schema, collection_matches_schema, indexed_files, bump_index_version, aindex_version
+from component.firebase_fileUploads import list_collection_files, retrieve_collection_from_firebase, INDEXED_TYPES
+from component.semantic_cache import semantic_cache
+
+
+# One manifest per collection: the index schema plus {blob name: md5} of every indexed file
+INDEX_MANIFEST_DIR= os.getenv('INDEX_MANIFEST_DIR', './cache/manifests')
+
+
+def _manifest_path(collection_name):
+    return os.path.join(INDEX_MANIFEST_DIR, f'{collection_name}.json')
+
+
+def load_manifest(collection_name):
+    try:
+        with open(_manifest_path(collection_name), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest(collection_name, manifest):
+    os.makedirs(INDEX_MANIFEST_DIR, exist_ok=True)
+    path= _manifest_path(collection_name)
+    tmp_path= f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def delete_manifest(collection_name):
+    try:
+        os.remove(_manifest_path(collection_name))
+    except FileNotFoundError:
+        pass
+
+
+async def index_version(collection_name):
+    # Kept in Qdrant rather than derived from the manifest: manifests are local
+    # to each worker, while the semantic cache must see changes made anywhere
+    return await aindex_version(collection_name)
+
+
+def index_collection(collection_name, folder_path):
+    """
+    Bring a collection in line with its Firebase folder, embedding only what changed.
+
+    Files are compared by md5 against the collection's manifest: new and
+    modified files are (re)embedded, points of modified and removed files are
+    deleted by filename. A missing manifest is recovered from the filenames and
+    md5s stored on the points; the collection is only rebuilt when its schema
+    changed or it does not exist.
+
+    Args:
+        collection_name: Qdrant collection name ({uuid}-{folder})
+        folder_path: Firebase folder path ({uuid}/{folder}/)
+    Returns:
+        dict with the added, updated and removed filenames
+    """
+    files= list_collection_files(folder_path)
+    indexable= {name: md5 for name, (md5, content_type) in files.items() if content_type in INDEXED_TYPES}
+
+    manifest= load_manifest(collection_name)
+    if not indexable and manifest is None:
+        return {'added': [], 'updated': [], 'removed': []}
+
+    schema= index_schema()
+    matches= collection_matches_schema(collection_name, refresh=True)
+    if manifest is None and matches:
+        # Manifests are per-worker local files; a worker without one recovers
+        # it from the points instead of wiping a collection others populated
+        manifest= {'schema': schema, 'files': indexed_files(collection_name)}
+        print(f"Recovered manifest of {collection_name} from Qdrant: {len(manifest['files'])} files")
+    rebuild= manifest is None or manifest.get('schema') != schema or not matches
+    if rebuild:
+        manifest= {'schema': schema, 'files': {}}
+    vector_store= create_vectorstore(collection_name, recreate=rebuild)
+
+    indexed= manifest['files']
+    added= [name for name in indexable if name not in indexed]
+    updated= [name for name, md5 in indexable.items() if name in indexed and indexed[name] != md5]
+    removed= [name for name in indexed if name not in indexable]
+
+    stale= updated + removed
+    # Added files too: a run that failed partway through embedding one left
+    # chunks behind that the manifest does not list
+    leftover= [] if rebuild else added
+    if stale or leftover:
+        delete_file_points(collection_name, stale + leftover)
+    if stale:
+        for name in stale:
+            del indexed[name]
+        save_manifest(collection_name, manifest)
+
+    changed= added + updated
+    if changed:
+        docs, _ = retrieve_collection_from_firebase(folder_path, filenames=changed)
+        if docs:
+            # Lets a lost manifest be recovered from the points
+            for doc in docs:
+                doc.metadata['file_md5']= indexable.get(doc.metadata.get('filename'))
+            append_PDFdata_vectorstore(vector_store, docs)
+        for name in changed:
+            indexed[name]= indexable[name]
+    save_manifest(collection_name, manifest)
+    bump_index_version(collection_name)
+    semantic_cache.invalidate(collection_name)
+
+    print(f"Indexed {collection_name}: {len(added)} added, {len(updated)} updated, {len(removed)} removed")
+    return {'added': added, 'updated': updated, 'removed': removed}
+
+
+def delete_index(collection_name):
+    delete_collection(collection_name)
+    delete_manifest(collection_name)
+    bump_index_version(collection_name)
+    semantic_cache.invalidate(collection_name)
+
+
+def _blob_prefix(folder_path):
+    parts = folder_path.split('/')
+    return f"users/{parts[0]}/folders/{parts[1]}/"
+
+
+def rename_index(old_collection_name, new_collection_name, old_folder_path, new_folder_path):
+    """
+    Move an index to a renamed folder by copying its points, then reconcile.
+
+    File md5s survive the Firebase rename, so the reconcile step finds nothing
+    to embed unless the folder content also changed.
+    """
+    old_prefix= _blob_prefix(old_folder_path)
+    new_prefix= _blob_prefix(new_folder_path)
+
+    manifest= load_manifest(old_collection_name)
+    if rename_collection(old_collection_name, new_collection_name, old_prefix, new_prefix) and manifest is not None:
+        manifest['files']= {
+            (new_prefix + name[len(old_prefix):] if name.startswith(old_prefix) else name): md5
+            for name, md5 in manifest['files'].items()
+        }
+        save_manifest(new_collection_name, manifest)
+    delete_manifest(old_collection_name)
+    bump_index_version(old_collection_name)
+    semantic_cache.invalidate(old_collection_name)
+
+    return index_collection(new_collection_name, new_folder_path)
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import html
+import os
+import re
+import time
+
+from component.cache import DiskCache
+from component.prompt import prompt_latex
+from component.response import adoc_agent_response
+
+
+# Rendered HTML keyed by sha256(renderer, response text)
+LATEX_CACHE_DIR= os.getenv('LATEX_CACHE_DIR', './cache/latex')
+LATEX_CACHE_MAX_BYTES= int(os.getenv('LATEX_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Seconds a failed job's error stays readable before it is dropped
+LATEX_JOB_ERROR_TTL= float(os.getenv('LATEX_JOB_ERROR_TTL', 600))
+
+latex_cache= DiskCache(LATEX_CACHE_DIR, LATEX_CACHE_MAX_BYTES)
+
+RENDERERS= ['local', 'llm']
+
+HTML_HEAD= '''<head>
+<title>Response</title>
+<script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
+</head>'''
+
+# Display math first so $$...$$ is not read as two inline spans
+MATH_PATTERN= re.compile(r'(\$\$.+?\$\$|\\\[.+?\\\]|\\\(.+?\\\)|(?<![\\$])\$(?!\s)[^$\n]+?(?<!\s)\$)', re.DOTALL)
+
+
+def clean_latex(text):
+    return re.sub(r'```html', '```', text)
+
+
+def _protect_math(text):
+    # MathJax reads the TeX from the page, so math must survive escaping untouched
+    spans= []
+
+    def stash(match):
+        spans.append(match.group(0))
+        return f'\x00{len(spans) - 1}\x00'
+
+    return MATH_PATTERN.sub(stash, text), spans
+
+
+def _restore_math(text, spans):
+    return re.sub(r'\x00(\d+)\x00', lambda m: html.escape(spans[int(m.group(1))], quote=False), text)
+
+
+def _inline(text):
+    text= html.escape(text, quote=False)
+    text= re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+    text= re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
+    text= re.sub(r'(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])', r'<em>\1</em>', text)
+    return text
+
+
+def markdown_to_html(text):
+    """
+    Convert the markdown Gemini answers in (headings, lists, emphasis, code,
+    paragraphs) to HTML, leaving $...$, $$...$$, \\(...\\) and \\[...\\] for MathJax.
+    """
+    text, spans= _protect_math(text)
+
+    out= []
+    paragraph= []
+    list_tag= None
+    in_code= False
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f'</{list_tag}>')
+            list_tag= None
+
+    for line in text.splitlines():
+        stripped= line.strip()
+
+        if stripped.startswith('```'):
+            flush_paragraph()
+            close_list()
+            out.append('</code></pre>' if in_code else '<pre><code>')
+            in_code= not in_code
+            continue
+        if in_code:
+            out.append(html.escape(line, quote=False))
+            continue
+
+        heading= re.match(r'(#{1,6})\s+(.*)', stripped)
+        bullet= re.match(r'[-*+]\s+(.*)', stripped)
+        numbered= re.match(r'\d+[.)]\s+(.*)', stripped)
+
+        if not stripped:
+            flush_paragraph()
+            close_list()
+        elif heading:
+            flush_paragraph()
+            close_list()
+            level= len(heading.group(1))
+            out.append(f'<h{level}>{_inline(heading.group(2))}</h{level}>')
+        elif bullet or numbered:
+            flush_paragraph()
+            tag= 'ul' if bullet else 'ol'
+            if list_tag != tag:
+                close_list()
+                out.append(f'<{tag}>')
+                list_tag= tag
+            out.append(f'<li>{_inline((bullet or numbered).group(1))}</li>')
+        else:
+            close_list()
+            paragraph.append(stripped)
+
+    flush_paragraph()
+    close_list()
+    if in_code:
+        out.append('</code></pre>')
+
+    return _restore_math('\n'.join(out), spans)
+
+
+def render_local(text):
+    body= markdown_to_html(str(text))
+    # Same ``` fenced shape clients already unwrap from the LLM renderer
+    return f'```\n<html>\n{HTML_HEAD}\n<body>\n{body}\n</body>\n</html>\n```'
+
+
+async def render_llm(text):
+    inter_response= await adoc_agent_response(prompt_latex,text,'NONE', prompt_latex)
+    return clean_latex(inter_response)
+
+
+def latex_key(text, renderer):
+    return hashlib.sha256(f'{renderer}\0{text}'.encode('utf-8')).hexdigest()
+
+
+async def render_latex(text, renderer='local'):
+    key= latex_key(text, renderer)
+    cached= latex_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if renderer == 'llm':
+        rendered= await render_llm(text)
+    else:
+        try:
+            rendered= render_local(text)
+        except Exception as e:
+            print(f"Local LaTeX rendering failed, falling back to LLM: {e}")
+            rendered= await render_llm(text)
+
+    latex_cache.set(key, rendered)
+    return rendered
+
+
+# Pending and failed background jobs of this worker. Finished results are read
+# back from the cache, so any worker sharing LATEX_CACHE_DIR can answer for them;
+# errors are dropped once read or after LATEX_JOB_ERROR_TTL.
+_jobs= {}
+
+
+def _prune_jobs():
+    now= time.monotonic()
+    for job_id, job in list(_jobs.items()):
+        if job['status'] == 'error' and now - job['finished'] > LATEX_JOB_ERROR_TTL:
+            del _jobs[job_id]
+
+
+def submit_latex_job(text, renderer='local'):
+    _prune_jobs()
+    job_id= latex_key(text, renderer)
+    job= _jobs.get(job_id)
+    # A failed job is retried on resubmission
+    if (job and job['status'] == 'pending') or latex_cache.get(job_id) is not None:
+        return job_id
+
+    async def run():
+        try:
+            await render_latex(text, renderer)
+            _jobs.pop(job_id, None)
+        except Exception as e:
+            _jobs[job_id]= {'status': 'error', 'detail': str(e), 'finished': time.monotonic()}
+
+    _jobs[job_id]= {'status': 'pending', 'task': asyncio.create_task(run())}
+    return job_id
+
+
+def latex_job_status(job_id):
+    rendered= latex_cache.get(job_id)
+    if rendered is not None:
+        return {'status': 'done', 'response_latex': rendered}
+
+    _prune_jobs()
+    job= _jobs.get(job_id)
+    if job is None:
+        return None
+    if job['status'] == 'error':
+        del _jobs[job_id]
+        return {'status': 'error', 'detail': job['detail']}
+    return {'status': 'pending'}
@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from component.cache import DiskCache
+
+
+# Exact-match cache of model answers. Backend is "memory" (per worker) or
+# "disk" (shared by workers on the same host).
+LLM_CACHE_BACKEND= os.getenv('LLM_CACHE_BACKEND', 'memory')
+LLM_CACHE_TTL= float(os.getenv('LLM_CACHE_TTL', 3600))
+LLM_CACHE_MAX_ENTRIES= int(os.getenv('LLM_CACHE_MAX_ENTRIES', 2048))
+LLM_CACHE_DIR= os.getenv('LLM_CACHE_DIR', './cache/llm')
+LLM_CACHE_MAX_BYTES= int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self.max_entries= max_entries
+        self._entries= OrderedDict()
+        self._lock= threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry= self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key]= entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskBackend:
+    def __init__(self, directory, max_bytes):
+        self._cache= DiskCache(directory, max_bytes)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, entry):
+        self._cache.set(key, entry)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+
+class ResponseCache:
+    """
+    TTL cache of function results with hit-rate and saved-latency counters.
+
+    Entries are (expires_at, elapsed, value); elapsed is how long the original
+    call took, which is what a hit saves.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend= backend
+        self.ttl= ttl
+        self.hits= 0
+        self.misses= 0
+        self.saved_seconds= 0.0
+        self._lock= threading.Lock()
+
+    def get(self, key):
+        entry= self.backend.get(key)
+        if entry is not None and entry[0] < time.time():
+            self.backend.delete(key)
+            entry= None
+
+        with self._lock:
+            if entry is None:
+                self.misses+= 1
+                return False, None
+            self.hits+= 1
+            self.saved_seconds+= entry[1]
+        return True, entry[2]
+
+    def set(self, key, value, elapsed):
+        self.backend.set(key, (time.time() + self.ttl, elapsed, value))
+
+    def stats(self):
+        with self._lock:
+            total= self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+                'saved_seconds': round(self.saved_seconds, 3),
+            }
+
+
+if LLM_CACHE_BACKEND == 'disk':
+    response_cache= ResponseCache(DiskBackend(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES), LLM_CACHE_TTL)
+else:
+    response_cache= ResponseCache(MemoryBackend(LLM_CACHE_MAX_ENTRIES), LLM_CACHE_TTL)
+
+
+def _canonical(value):
+    # json.dumps fallback for the non-JSON inputs our entry points receive
+    if isinstance(value, (bytes, bytearray)):
+        return {'sha256': hashlib.sha256(value).hexdigest()}
+    if hasattr(value, 'page_content'):
+        return {'page_content': value.page_content, 'metadata': getattr(value, 'metadata', {})}
+    return str(value)
+
+
+def cache_key(namespace, params, args, kwargs):
+    payload= json.dumps([namespace, params, args, kwargs], sort_keys=True, default=_canonical)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _is_error(result):
+    # The agents report failures as "Error ..." strings rather than raising
+    return isinstance(result, str) and result.startswith('Error')
+
+
+def cached_response(namespace, params=None):
+    """
+    Cache a sync or async model call on a canonical hash of its arguments,
+    the namespace and the model parameters.
+    """
+    params= params or {}
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key= cache_key(namespace, params, args, kwargs)
+                hit, value= response_cache.get(key)
+                if hit:
+                    return value
+                started= time.perf_counter()
+                result= await fn(*args, **kwargs)
+                if not _is_error(result):
+                    response_cache.set(key, result, time.perf_counter() - started)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key= cache_key(namespace, params, args, kwargs)
+            hit, value= response_cache.get(key)
+            if hit:
+                return value
+            started= time.perf_counter()
+            result= fn(*args, **kwargs)
+            if not _is_error(result):
+                response_cache.set(key, result, time.perf_counter() - started)
+            return result
+        return wrapper
+
+    return decorator
@@ -0,0 +1,93 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from component.rate_limit import llm_limiter
+
+load_dotenv()
+
+
+llm_key= os.getenv('LLM_KEY')
+
+# Seconds the startup health probe may take before the server starts anyway
+LLM_WARMUP_TIMEOUT= float(os.getenv('LLM_WARMUP_TIMEOUT', 20))
+
+
+class LimitedChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    ChatGoogleGenerativeAI whose every generation, sync or async, plain or
+    streamed, holds a slot of the shared llm_limiter. Agents built on it are
+    limited per model call, not per request.
+    """
+
+    def _generate(self, *args, **kwargs):
+        with llm_limiter.slot():
+            return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        async with llm_limiter.aslot():
+            return await super()._agenerate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        with llm_limiter.slot():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        async with llm_limiter.aslot():
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+
+class ChatModelRegistry:
+    """
+    One ChatGoogleGenerativeAI per (model, temperature, max tokens, options).
+
+    A client owns its HTTP/gRPC channel, so sharing it reuses connections
+    instead of paying the channel setup on every request.
+    """
+
+    def __init__(self):
+        self._models= {}
+        self._lock= threading.Lock()
+
+    def get(self, model, temperature=None, max_output_tokens=None, **options):
+        key= (model, temperature, max_output_tokens, tuple(sorted(options.items())))
+        with self._lock:
+            chat_model= self._models.get(key)
+            if chat_model is None:
+                params= {'temperature': temperature, 'max_output_tokens': max_output_tokens, **options}
+                chat_model= LimitedChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=llm_key,
+                    **{name: value for name, value in params.items() if value is not None},
+                )
+                self._models[key]= chat_model
+            return chat_model
+
+    def warm(self):
+        """
+        Open every registered client's channel with a token-count call, the
+        cheapest request the API offers. Returns {model key: 'ok' | error}.
+        """
+        with self._lock:
+            models= dict(self._models)
+
+        health= {}
+        for key, chat_model in models.items():
+            name= f'{key[0]}@{key[1]}/{key[2]}'
+            try:
+                chat_model.get_num_tokens('ping')
+                health[name]= 'ok'
+            except Exception as e:
+                health[name]= str(e)
+                print(f"LLM client warmup failed for {name}: {e}")
+        return health
+
+
+chat_models= ChatModelRegistry()
+
+
+def get_chat_model(model, temperature=None, max_output_tokens=None, **options):
+    return chat_models.get(model, temperature, max_output_tokens, **options)
@@ -0,0 +1,70 @@
+"""
+Copy per-folder Qdrant collections into the shared multi-tenant collection.
+
+Usage:
+    python -m component.migrate_collections [--delete-source] [collection ...]
+
+Points keep their ids and vectors; their metadata is stamped with the
+uuid/folder/collection tenant keys derived from the filename. Run it before
+switching QDRANT_STORAGE_MODE to "shared".
+"""
+import argparse
+
+from qdrant_client.http.models import PointStruct
+
+from component.vectordb import client, vector_config, QDRANT_SHARED_COLLECTION, RENAME_BATCH_SIZE, create_payload_indexes, tenant_metadata
+
+
+def migrate_collection(collection_name, delete_source=False):
+    offset= None
+    copied= 0
+    while True:
+        points, offset= client.scroll(
+            collection_name=collection_name,
+            limit=RENAME_BATCH_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        batch= []
+        for point in points:
+            payload= point.payload
+            metadata= payload.setdefault('metadata', {})
+            metadata.update(tenant_metadata(metadata.get('filename', '')))
+            # Older points without a parsable filename still belong to this folder
+            metadata['collection']= collection_name
+            batch.append(PointStruct(id=point.id, vector=point.vector, payload=payload))
+        if batch:
+            client.upsert(collection_name=QDRANT_SHARED_COLLECTION, points=batch, wait=True)
+            copied+= len(batch)
+        if offset is None:
+            break
+
+    if delete_source:
+        client.delete_collection(collection_name=collection_name)
+    print(f"Migrated {collection_name}: {copied} points")
+    return copied
+
+
+def main():
+    parser= argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('collections', nargs='*', help='collections to migrate (default: all except the shared one)')
+    parser.add_argument('--delete-source', action='store_true', help='drop each per-folder collection once copied')
+    args= parser.parse_args()
+
+    if not client.collection_exists(QDRANT_SHARED_COLLECTION):
+        client.create_collection(collection_name=QDRANT_SHARED_COLLECTION, vectors_config=vector_config)
+    # Idempotent: also adds indexes missing from a shared collection created earlier
+    create_payload_indexes(QDRANT_SHARED_COLLECTION)
+
+    names= args.collections or [
+        c.name for c in client.get_collections().collections if c.name != QDRANT_SHARED_COLLECTION
+    ]
+    total= 0
+    for name in names:
+        total+= migrate_collection(name, delete_source=args.delete_source)
+    print(f"Migrated {len(names)} collections, {total} points into {QDRANT_SHARED_COLLECTION}")
+
+
+if __name__ == "__main__":
+    main()
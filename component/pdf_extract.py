@@ -0,0 +1,174 @@
+import io
+import os
+import threading
+import time
+
+from PyPDF2 import PdfReader
+from langchain.docstore.document import Document
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+
+# Backends are tried in this order; PyPDF2 is always available as the last resort
+PDF_BACKENDS = [name.strip() for name in os.getenv('PDF_BACKENDS', 'pymupdf,pypdfium2,pypdf2').split(',') if name.strip()]
+# Pages per process-pool task when a PDF is split across workers
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 16))
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def available_backends():
+    installed = {
+        'pymupdf': fitz is not None,
+        'pypdfium2': pdfium is not None,
+        'pypdf2': True,
+    }
+    backends = [name for name in PDF_BACKENDS if installed.get(name)]
+    if 'pypdf2' not in backends:
+        backends.append('pypdf2')
+    return backends
+
+
+def _page_count(backend, content):
+    if backend == 'pymupdf':
+        with fitz.open(stream=content, filetype='pdf') as doc:
+            return doc.page_count
+    if backend == 'pypdfium2':
+        pdf = pdfium.PdfDocument(content)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    return len(PdfReader(io.BytesIO(content)).pages)
+
+
+def _extract_range(backend, content, start, stop):
+    """
+    Extract the text of pages [start, stop) with the given backend.
+
+    Module-level so it can be shipped to a process pool.
+    """
+    texts = []
+    if backend == 'pymupdf':
+        with fitz.open(stream=content, filetype='pdf') as doc:
+            for pnum in range(start, stop):
+                texts.append(doc[pnum].get_text())
+
+    elif backend == 'pypdfium2':
+        pdf = pdfium.PdfDocument(content)
+        try:
+            for pnum in range(start, stop):
+                page = pdf[pnum]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+
+    else:
+        reader = PdfReader(io.BytesIO(content))
+        for pnum in range(start, stop):
+            texts.append(reader.pages[pnum].extract_text())
+
+    return texts
+
+
+def should_split(content):
+    """
+    Whether a PDF has enough pages to be split into page ranges across the
+    process pool. Smaller ones are cheaper to parse whole in one worker.
+    """
+    for backend in available_backends():
+        try:
+            return _page_count(backend, content) >= PDF_PAGES_PER_TASK * 2
+        except Exception:
+            continue
+    return False
+
+
+def _extract_with_backend(backend, content, executor):
+    total = _page_count(backend, content)
+    if executor is None or total < PDF_PAGES_PER_TASK * 2:
+        return _extract_range(backend, content, 0, total)
+
+    futures = [
+        executor.submit(_extract_range, backend, content, start, min(start + PDF_PAGES_PER_TASK, total))
+        for start in range(0, total, PDF_PAGES_PER_TASK)
+    ]
+    texts = []
+    for future in futures:
+        texts.extend(future.result())
+    return texts
+
+
+def _record(backend, pages, seconds):
+    with _stats_lock:
+        entry = _stats.setdefault(backend, {'pages': 0, 'seconds': 0.0})
+        entry['pages'] += pages
+        entry['seconds'] += seconds
+
+
+def backend_stats():
+    """
+    Pages/sec observed per backend since startup.
+    """
+    with _stats_lock:
+        return {
+            backend: {
+                'pages': entry['pages'],
+                'seconds': round(entry['seconds'], 3),
+                'pages_per_sec': round(entry['pages'] / entry['seconds'], 2) if entry['seconds'] else None,
+            }
+            for backend, entry in _stats.items()
+        }
+
+
+def extract_pdf_pages(content, executor=None):
+    """
+    Extract the text of every page of a PDF.
+
+    Args:
+        content: Raw PDF bytes
+        executor: Optional process pool; large PDFs are split into page ranges across it
+    Returns:
+        List of page texts in page order
+    """
+    last_error = None
+    for backend in available_backends():
+        started = time.perf_counter()
+        try:
+            texts = _extract_with_backend(backend, content, executor)
+        except Exception as e:
+            print(f"PDF backend {backend} failed, falling back: {e}")
+            last_error = e
+            continue
+
+        elapsed = time.perf_counter() - started
+        _record(backend, len(texts), elapsed)
+        if elapsed:
+            print(f"PDF backend {backend}: {len(texts)} pages in {elapsed:.2f}s ({len(texts) / elapsed:.1f} pages/sec)")
+        return texts
+
+    raise last_error
+
+
+def extract_pdf_documents(blob_name, content, executor=None):
+    """
+    Extract a PDF into one Document per page, with filename and page number metadata.
+    """
+    texts = extract_pdf_pages(content, executor=executor)
+    return [
+        Document(page_content=pdf_text, metadata={"filename": blob_name, 'page number': pnum})
+        for pnum, pdf_text in enumerate(texts, start=1)
+    ]
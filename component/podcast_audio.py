@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+import struct
+import tempfile
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pyttsx3
+from pydub import AudioSegment, effects
+
+from component.cache import DiskCache
+
+
+# Offline TTS for /podcast audio mode. Every line is rendered in its own worker
+# process, normalized to one PCM format and streamed as a single WAV.
+PODCAST_TTS_WORKERS= int(os.getenv('PODCAST_TTS_WORKERS', os.cpu_count() or 1))
+PODCAST_SAMPLE_RATE= int(os.getenv('PODCAST_SAMPLE_RATE', 22050))
+PODCAST_SPEECH_RATE= int(os.getenv('PODCAST_SPEECH_RATE', 175))
+PODCAST_PAUSE_MS= int(os.getenv('PODCAST_PAUSE_MS', 300))
+# pyttsx3 voice ids; unset picks the first installed voice of that gender, else by position
+PODCAST_VOICES= {
+    'male': os.getenv('PODCAST_MALE_VOICE'),
+    'female': os.getenv('PODCAST_FEMALE_VOICE'),
+}
+PODCAST_AUDIO_CACHE_DIR= os.getenv('PODCAST_AUDIO_CACHE_DIR', './cache/podcast_audio')
+PODCAST_AUDIO_CACHE_MAX_BYTES= int(os.getenv('PODCAST_AUDIO_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+SPEAKERS= ['male', 'female']
+CHANNELS= 1
+SAMPLE_WIDTH= 2
+
+segment_cache= DiskCache(PODCAST_AUDIO_CACHE_DIR, PODCAST_AUDIO_CACHE_MAX_BYTES)
+
+_tts_executor= None
+_tts_executor_lock= threading.Lock()
+
+
+def get_tts_executor():
+    # Created lazily so importing this module does not fork worker processes
+    global _tts_executor
+    with _tts_executor_lock:
+        if _tts_executor is None:
+            # forkserver: by now the process has thread pools and gRPC channels, and a
+            # plain fork would copy locks other threads hold into the workers
+            _tts_executor= ProcessPoolExecutor(max_workers=PODCAST_TTS_WORKERS, mp_context=multiprocessing.get_context('forkserver'))
+        return _tts_executor
+
+
+# One engine per worker process; pyttsx3 engines are not shareable across processes
+_engine= None
+
+
+def _tts_engine():
+    global _engine
+    if _engine is None:
+        _engine= pyttsx3.init()
+    return _engine
+
+
+def _voice_id(engine, speaker):
+    # None keeps the engine's default voice
+    if PODCAST_VOICES.get(speaker):
+        return PODCAST_VOICES[speaker]
+    voices= engine.getProperty('voices') or []
+    for voice in voices:
+        if str(getattr(voice, 'gender', '') or '').lower() == speaker:
+            return voice.id
+    if not voices:
+        return None
+    return voices[min(SPEAKERS.index(speaker), len(voices) - 1)].id
+
+
+def render_segment(speaker, text):
+    """
+    Synthesize one line and return it as normalized mono 16-bit PCM at
+    PODCAST_SAMPLE_RATE, with its audio parameters. Runs in a TTS worker process.
+    """
+    engine= _tts_engine()
+    voice_id= _voice_id(engine, speaker)
+    if voice_id:
+        engine.setProperty('voice', voice_id)
+    engine.setProperty('rate', PODCAST_SPEECH_RATE)
+
+    fd, path= tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        segment= AudioSegment.from_file(path, format='wav')
+    finally:
+        os.remove(path)
+
+    segment= segment.set_frame_rate(PODCAST_SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+    return _segment_entry(effects.normalize(segment))
+
+
+def _segment_entry(segment):
+    return {
+        'pcm': segment.raw_data,
+        'frame_rate': segment.frame_rate,
+        'channels': segment.channels,
+        'sample_width': segment.sample_width,
+    }
+
+
+def _stream_segment(entry):
+    # Conformed to the stream's header, so an entry in any format can't corrupt it
+    segment= AudioSegment(
+        data=entry['pcm'],
+        sample_width=entry['sample_width'],
+        frame_rate=entry['frame_rate'],
+        channels=entry['channels'],
+    )
+    return segment.set_frame_rate(PODCAST_SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+
+
+def segment_key(speaker, text):
+    voice= PODCAST_VOICES.get(speaker) or speaker
+    return hashlib.sha256(f'v2\0{voice}\0{PODCAST_SPEECH_RATE}\0{PODCAST_SAMPLE_RATE}\0{text}'.encode('utf-8')).hexdigest()
+
+
+async def _segment_audio(speaker, text):
+    key= segment_key(speaker, text)
+    cached= segment_cache.get(key)
+    if cached is not None:
+        return cached
+
+    loop= asyncio.get_running_loop()
+    entry= await loop.run_in_executor(get_tts_executor(), render_segment, speaker, text)
+    segment_cache.set(key, entry)
+    return entry
+
+
+def dialogue_lines(dialogue):
+    """Flatten [{"male": ..., "female": ...}, ...] into ordered (speaker, text) lines."""
+    lines= []
+    for turn in dialogue:
+        for speaker in SPEAKERS:
+            text= str(turn.get(speaker) or '').strip()
+            if text:
+                lines.append((speaker, text))
+    return lines
+
+
+def wav_header():
+    # Unknown total length: players treat 0xFFFFFFFF sizes as "read until EOF"
+    byte_rate= PODCAST_SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+    return (
+        b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+        + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, CHANNELS, PODCAST_SAMPLE_RATE, byte_rate, CHANNELS * SAMPLE_WIDTH, SAMPLE_WIDTH * 8)
+        + b'data' + struct.pack('<I', 0xFFFFFFFF)
+    )
+
+
+async def stream_podcast_wav(dialogue):
+    """
+    Yield a WAV stream of the dialogue. All lines start rendering at once
+    across the process pool; each is sent as soon as it and every line before
+    it are ready, so playback starts while later lines are still rendering.
+    """
+    pause= AudioSegment.silent(duration=PODCAST_PAUSE_MS, frame_rate=PODCAST_SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+    tasks= [asyncio.ensure_future(_segment_audio(speaker, text)) for speaker, text in dialogue_lines(dialogue)]
+
+    try:
+        yield wav_header()
+        for task in tasks:
+            yield (_stream_segment(await task) + pause).raw_data
+    finally:
+        # Client went away: stop waiting on lines nobody will hear
+        for task in tasks:
+            task.cancel()
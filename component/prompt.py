@@ -93,12 +93,28 @@ convert the provided content into latex and use this in html
 
 <title>Boundary Work Formulas</title>
 
-<script src="https://polyfill.io/v3/polyfill.min.js?features=es6"></script>
-
 <script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
 
 </head>
 
 and convert all into html and only give the html code
 
-'''
\ No newline at end of file
+'''
+
+prompt_history_summary= '''
+You are given the running summary of an earlier conversation and the turns that followed it.
+Merge them into one concise summary that keeps the facts, figures, decisions, open questions and any files or names the user referred to.
+Write plain prose, no preamble.
+'''
+
+prompt_report_segment= '''
+You are given one consecutive segment of a longer chat history.
+Summarize it so it can later be merged with the summaries of the other segments: keep every question asked, the answers given, facts, figures, file names and conclusions, in the order they came up.
+Write plain prose, no preamble.
+'''
+
+prompt_report_merge= '''
+You are given summaries of consecutive parts of one chat history, in order.
+Merge them into a single summary that keeps the facts, figures, file names, conclusions and the order in which topics came up.
+Write plain prose, no preamble.
+'''
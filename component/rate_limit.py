@@ -0,0 +1,222 @@
+import asyncio
+import contextlib
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# Every Gemini call takes a slot from one shared limiter. The number of slots
+# adapts AIMD-style: +1/limit per call answered within the latency target,
+# halved (at most once per typical call duration) on a 429 or a slow call.
+LLM_CONCURRENCY_INITIAL= float(os.getenv('LLM_CONCURRENCY_INITIAL', 8))
+LLM_CONCURRENCY_MIN= float(os.getenv('LLM_CONCURRENCY_MIN', 1))
+LLM_CONCURRENCY_MAX= float(os.getenv('LLM_CONCURRENCY_MAX', 64))
+LLM_LATENCY_TARGET= float(os.getenv('LLM_LATENCY_TARGET', 30))
+LLM_BACKOFF= float(os.getenv('LLM_BACKOFF', 0.5))
+# Longest a call may queue for a slot, and how many calls one tenant may queue
+LLM_QUEUE_TIMEOUT= float(os.getenv('LLM_QUEUE_TIMEOUT', 15))
+LLM_MAX_QUEUE_PER_TENANT= int(os.getenv('LLM_MAX_QUEUE_PER_TENANT', 32))
+
+
+# Set from the request's uuid by the handlers; run_blocking carries it into worker threads
+current_tenant= contextvars.ContextVar('current_tenant', default='anonymous')
+
+
+class Overloaded(Exception):
+    """Raised when a model call cannot get a slot before its queue deadline."""
+
+    def __init__(self, retry_after, message='LLM capacity exhausted, retry later'):
+        super().__init__(message)
+        self.retry_after= retry_after
+
+
+def is_rate_limited(error):
+    text= f'{type(error).__name__} {error}'
+    return 'ResourceExhausted' in text or '429' in text or 'quota' in text.lower()
+
+
+class _Waiter:
+    def __init__(self, tenant, loop=None):
+        self.tenant= tenant
+        self.loop= loop
+        self.granted= False
+        self.event= loop.create_future() if loop else threading.Event()
+
+    def wake(self):
+        self.granted= True
+        if self.loop:
+            self.loop.call_soon_threadsafe(lambda: self.event.done() or self.event.set_result(True))
+        else:
+            self.event.set()
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit with round-robin queues per tenant.
+
+    Usable from sync code (agents in worker threads) through slot() and from
+    the event loop through aslot(); both share one count of calls in flight.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency_target, backoff, queue_timeout, max_queue_per_tenant):
+        self.limit= initial
+        self.minimum= minimum
+        self.maximum= maximum
+        self.latency_target= latency_target
+        self.backoff= backoff
+        self.queue_timeout= queue_timeout
+        self.max_queue_per_tenant= max_queue_per_tenant
+
+        self.inflight= 0
+        # Seeded by the first completed call; until then nothing is rejected on
+        # an estimate and queued calls are only bounded by queue_timeout
+        self.latency= None
+        self.last_decrease= 0.0
+        self.calls= 0
+        self.throttled= 0
+        self.rejected= 0
+        self._queues= OrderedDict()
+        self._lock= threading.Lock()
+
+    def _queued(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _estimated_wait(self):
+        # Calls ahead of us drain limit at a time, each taking about one latency
+        if self.latency is None:
+            return 0.0
+        return (self._queued() + 1) / max(self.limit, 1) * self.latency
+
+    def _enter(self, tenant, loop=None):
+        """Take a slot now (returns None) or enqueue and return the waiter."""
+        with self._lock:
+            if self.inflight < int(self.limit) and not self._queued():
+                self.inflight+= 1
+                return None
+
+            wait= self._estimated_wait()
+            queue= self._queues.get(tenant)
+            if wait > self.queue_timeout or (queue and len(queue) >= self.max_queue_per_tenant):
+                self.rejected+= 1
+                raise Overloaded(math.ceil(max(1.0, wait)))
+
+            waiter= _Waiter(tenant, loop)
+            self._queues.setdefault(tenant, deque()).append(waiter)
+            return waiter
+
+    def _abandon(self, waiter):
+        """Drop a waiter that timed out; False if it was granted a slot meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            queue= self._queues.get(waiter.tenant)
+            if queue and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[waiter.tenant]
+            self.rejected+= 1
+            return True
+
+    def _dispatch(self):
+        # Caller holds the lock. Tenants take turns, one waiter each.
+        while self._queues and self.inflight < int(self.limit):
+            tenant, queue= self._queues.popitem(last=False)
+            waiter= queue.popleft()
+            if queue:
+                self._queues[tenant]= queue
+            self.inflight+= 1
+            waiter.wake()
+
+    def _exit(self, latency, throttled):
+        with self._lock:
+            self.inflight-= 1
+            self.calls+= 1
+            self.latency= latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            now= time.monotonic()
+
+            if throttled or latency > self.latency_target:
+                self.throttled+= throttled
+                if now - self.last_decrease > self.latency:
+                    self.limit= max(self.minimum, self.limit * self.backoff)
+                    self.last_decrease= now
+            else:
+                self.limit= min(self.maximum, self.limit + 1 / self.limit)
+
+            self._dispatch()
+
+    def _release_unused(self):
+        # A slot granted to a waiter that was cancelled before using it
+        with self._lock:
+            self.inflight-= 1
+            self._dispatch()
+
+    def _retry_after(self):
+        with self._lock:
+            return math.ceil(max(1.0, self._estimated_wait()))
+
+    @contextlib.contextmanager
+    def slot(self):
+        waiter= self._enter(current_tenant.get())
+        if waiter is not None and not waiter.event.wait(self.queue_timeout) and self._abandon(waiter):
+            raise Overloaded(self._retry_after())
+
+        started= time.monotonic()
+        throttled= False
+        try:
+            yield
+        except Exception as e:
+            throttled= is_rate_limited(e)
+            raise
+        finally:
+            self._exit(time.monotonic() - started, throttled)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self):
+        waiter= self._enter(current_tenant.get(), asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.event), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if self._abandon(waiter):
+                    raise Overloaded(self._retry_after())
+            except asyncio.CancelledError:
+                if not self._abandon(waiter):
+                    self._release_unused()
+                raise
+
+        started= time.monotonic()
+        throttled= False
+        try:
+            yield
+        except Exception as e:
+            throttled= is_rate_limited(e)
+            raise
+        finally:
+            self._exit(time.monotonic() - started, throttled)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': round(self.limit, 2),
+                'inflight': self.inflight,
+                'queued': self._queued(),
+                'tenants_queued': len(self._queues),
+                'latency_ewma': None if self.latency is None else round(self.latency, 3),
+                'calls': self.calls,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+            }
+
+
+llm_limiter= AdaptiveLimiter(
+    LLM_CONCURRENCY_INITIAL,
+    LLM_CONCURRENCY_MIN,
+    LLM_CONCURRENCY_MAX,
+    LLM_LATENCY_TARGET,
+    LLM_BACKOFF,
+    LLM_QUEUE_TIMEOUT,
+    LLM_MAX_QUEUE_PER_TENANT,
+)
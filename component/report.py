@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import os
+
+from component.cache import DiskCache
+from component.chat_history import estimate_tokens, split_turns
+from component.prompt import prompt_report_segment, prompt_report_merge
+from component.response import adoc_agent_response
+
+
+# Chats above one segment are summarized segment by segment, then merged in
+# rounds of at most REPORT_SEGMENT_TOKENS of summaries until one call can
+# write the report.
+REPORT_SEGMENT_TOKENS= int(os.getenv('REPORT_SEGMENT_TOKENS', 6000))
+REPORT_MAP_CONCURRENCY= int(os.getenv('REPORT_MAP_CONCURRENCY', 4))
+REPORT_CACHE_DIR= os.getenv('REPORT_CACHE_DIR', './cache/report_segments')
+REPORT_CACHE_MAX_BYTES= int(os.getenv('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+segment_cache= DiskCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
+
+REPORT_PROMPT= 'You are provided with chat history'
+REPORT_QUERY= 'write a through report summary of the chat'
+
+
+def split_segments(turns, max_tokens):
+    """
+    Pack turns greedily into segments of at most max_tokens. Packing from the
+    start keeps earlier segments identical when turns are appended, so only
+    the tail segment changes between regenerations.
+    """
+    max_chars= max_tokens * 4
+    segments= []
+    current= []
+    size= 0
+
+    for turn in turns:
+        # A turn larger than a segment is cut into segment-sized pieces
+        pieces= [turn[i:i + max_chars] for i in range(0, len(turn), max_chars)] or ['']
+        for piece in pieces:
+            tokens= estimate_tokens(piece)
+            if current and size + tokens > max_tokens:
+                segments.append('\n'.join(current))
+                current, size= [], 0
+            current.append(piece)
+            size+= tokens
+
+    if current:
+        segments.append('\n'.join(current))
+    return segments
+
+
+def _segment_key(stage, text):
+    return hashlib.sha256(f'{stage}\0{text}'.encode('utf-8')).hexdigest()
+
+
+async def _summarize(stage, prompt, text, semaphore):
+    key= _segment_key(stage, text)
+    cached= segment_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async with semaphore:
+        summary= await adoc_agent_response(prompt, text, 'NONE', 'Summarize the provided content.')
+    summary= str(summary).strip()
+    if not summary.startswith('Error'):
+        segment_cache.set(key, summary)
+    return summary
+
+
+async def generate_chat_report(chat):
+    """
+    Report on a chat history of any length.
+
+    Chats that fit one segment go straight to the report prompt. Longer ones
+    are split into token-bounded segments summarized concurrently (map), and
+    the summaries merged in rounds (reduce) until they fit the final report
+    call. Segment and merge summaries are cached by content hash, so after a
+    few new turns only the tail segment and the merges above it are redone.
+    """
+    turns= split_turns(chat) if chat else []
+    segments= split_segments(turns, REPORT_SEGMENT_TOKENS)
+    if len(segments) <= 1:
+        return await adoc_agent_response(REPORT_PROMPT, chat, 'NONE', REPORT_QUERY)
+
+    semaphore= asyncio.Semaphore(REPORT_MAP_CONCURRENCY)
+    summaries= await asyncio.gather(*[_summarize('segment', prompt_report_segment, segment, semaphore) for segment in segments])
+
+    level= 0
+    while len(summaries) > 1 and estimate_tokens('\n\n'.join(summaries)) > REPORT_SEGMENT_TOKENS:
+        level+= 1
+        groups= split_segments(summaries, REPORT_SEGMENT_TOKENS)
+        if len(groups) == len(summaries):
+            # Every summary fills a segment on its own; merge pairs to make progress
+            groups= ['\n\n'.join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        summaries= await asyncio.gather(*[_summarize(f'merge{level}', prompt_report_merge, group, semaphore) for group in groups])
+
+    content= '\n\n'.join(f'Part {i + 1}: {summary}' for i, summary in enumerate(summaries))
+    return await adoc_agent_response(REPORT_PROMPT, content, 'NONE', REPORT_QUERY)
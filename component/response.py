@@ -27,6 +27,9 @@ import json
 from typing import Dict, List, Any, Union
 from langchain_community.tools.tavily_search import TavilySearchResults
 
+from component.llm_cache import cached_response
+from component.llm_clients import get_chat_model
+
 
 
 import warnings
@@ -39,14 +42,11 @@ llm_key= os.getenv('LLM_KEY')
 
 embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001",google_api_key=llm_key)
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash-latest",
+llm = get_chat_model(
+    "gemini-1.5-flash-latest",
     temperature=0.3,
     top_p=0.9,
-    max_tokens=None,
-    timeout=None,
     max_retries=2,
-    api_key=llm_key
 )
 
 
@@ -68,11 +68,15 @@ parser= StrOutputParser()
 
 chain= prompt | llm | parser
 
+# Shared by the sync and async variants so either can serve the other's hits
+DOC_AGENT_PARAMS= {'model': llm.model, 'temperature': llm.temperature, 'top_p': llm.top_p, 'template': prompt_template}
+
 
 
 
 
 
+@cached_response('doc_agent', DOC_AGENT_PARAMS)
 def doc_agent_response(prompt,content,chat,query ):
     
     res= chain.invoke(
@@ -86,6 +90,33 @@ def doc_agent_response(prompt,content,chat,query ):
     return res
 
 
+@cached_response('doc_agent', DOC_AGENT_PARAMS)
+async def adoc_agent_response(prompt,content,chat,query ):
+    
+    res= await chain.ainvoke(
+        {
+        'prompt': prompt,   
+        'content': content,
+        'chat': chat,
+        'query': query
+        }
+    )
+    return res
+
+
+async def adoc_agent_stream(prompt,content,chat,query ):
+    
+    async for token in chain.astream(
+        {
+        'prompt': prompt,   
+        'content': content,
+        'chat': chat,
+        'query': query
+        }
+    ):
+        yield token
+
+
 
 
 
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Near-duplicate questions on the same folder reuse an earlier answer when the
+# query embeddings are at least this similar and the index has not changed.
+SEMANTIC_CACHE_THRESHOLD= float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95))
+SEMANTIC_CACHE_MAX_ENTRIES= int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 256))
+SEMANTIC_CACHE_TTL= float(os.getenv('SEMANTIC_CACHE_TTL', 3600))
+# Least recently used collections are dropped beyond this many
+SEMANTIC_CACHE_MAX_COLLECTIONS= int(os.getenv('SEMANTIC_CACHE_MAX_COLLECTIONS', 1024))
+
+
+def answer_scope(prompt, chat_history):
+    # Answers only transfer between queries asked with the same instructions and history
+    payload= json.dumps([prompt, chat_history], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SemanticCache:
+    """
+    Per-collection list of (query embedding, answer) pairs, in an LRU of at
+    most max_collections collections.
+
+    Every entry remembers the index version it was answered against; a lookup
+    with a different version, or an explicit invalidate(), discards the
+    collection's entries. Expired entries, including those of collections
+    whose version moved on without another lookup, are swept once per ttl.
+    """
+
+    def __init__(self, threshold, max_entries, ttl, max_collections):
+        self.threshold= threshold
+        self.max_entries= max_entries
+        self.ttl= ttl
+        self.max_collections= max_collections
+        self.hits= 0
+        self.misses= 0
+        self._collections= OrderedDict()
+        self._last_sweep= time.time()
+        self._lock= threading.Lock()
+
+    def _sweep(self, now):
+        # Caller holds the lock
+        if now - self._last_sweep < self.ttl:
+            return
+        self._last_sweep= now
+        for collection_name in list(self._collections):
+            bucket= self._collections[collection_name]
+            bucket['entries']= [entry for entry in bucket['entries'] if entry['expires'] > now]
+            if not bucket['entries']:
+                del self._collections[collection_name]
+
+    def lookup(self, collection_name, version, scope, vector):
+        query= np.asarray(vector, dtype=np.float32)
+        query/= np.linalg.norm(query) or 1.0
+        now= time.time()
+
+        with self._lock:
+            self._sweep(now)
+            bucket= self._collections.get(collection_name)
+            if bucket is not None and bucket['version'] != version:
+                del self._collections[collection_name]
+                bucket= None
+            if bucket is not None:
+                self._collections.move_to_end(collection_name)
+
+            entries= [entry for entry in bucket['entries'] if entry['expires'] > now and entry['scope'] == scope] if bucket else []
+            if entries:
+                scores= np.stack([entry['vector'] for entry in entries]) @ query
+                best= int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits+= 1
+                    return entries[best]['answer']
+
+            self.misses+= 1
+            return None
+
+    def store(self, collection_name, version, scope, vector, answer):
+        stored= np.asarray(vector, dtype=np.float32)
+        stored/= np.linalg.norm(stored) or 1.0
+        now= time.time()
+
+        with self._lock:
+            self._sweep(now)
+            bucket= self._collections.get(collection_name)
+            if bucket is None or bucket['version'] != version:
+                bucket= {'version': version, 'entries': []}
+                self._collections[collection_name]= bucket
+            self._collections.move_to_end(collection_name)
+
+            bucket['entries']= [entry for entry in bucket['entries'] if entry['expires'] > now]
+            bucket['entries'].append({
+                'vector': stored,
+                'scope': scope,
+                'answer': answer,
+                'expires': now + self.ttl,
+            })
+            del bucket['entries'][:-self.max_entries]
+
+            while len(self._collections) > self.max_collections:
+                self._collections.popitem(last=False)
+
+    def invalidate(self, collection_name):
+        with self._lock:
+            self._collections.pop(collection_name, None)
+
+    def stats(self):
+        with self._lock:
+            total= self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+                'collections': len(self._collections),
+                'entries': sum(len(bucket['entries']) for bucket in self._collections.values()),
+                'threshold': self.threshold,
+            }
+
+
+semantic_cache= SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_MAX_COLLECTIONS)
@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+
+# Number of request keys whose collapse counts /metrics keeps
+SINGLEFLIGHT_METRIC_KEYS= int(os.getenv('SINGLEFLIGHT_METRIC_KEYS', 100))
+
+
+def request_key(route, path_params, request):
+    """
+    Normalized identity of a query request: path parameters plus the body with
+    surrounding and repeated whitespace in string fields collapsed.
+    """
+    def normalize(value):
+        if isinstance(value, str):
+            return re.sub(r'\s+', ' ', value).strip()
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        if isinstance(value, dict):
+            return {name: normalize(item) for name, item in value.items()}
+        return value
+
+    payload= json.dumps([route, path_params, normalize(request)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key onto one in-flight task.
+
+    Waiters are shielded from each other: a caller that disconnects does not
+    cancel the shared computation for the rest.
+    """
+
+    def __init__(self, metric_keys):
+        self.metric_keys= metric_keys
+        self.calls= 0
+        self.collapsed= 0
+        self._inflight= {}
+        self._key_stats= OrderedDict()
+
+    def _record(self, key, label, collapsed):
+        self.calls+= 1
+        stats= self._key_stats.pop(key, None) or {'label': label, 'calls': 0, 'collapsed': 0}
+        stats['calls']+= 1
+        if collapsed:
+            self.collapsed+= 1
+            stats['collapsed']+= 1
+        self._key_stats[key]= stats
+        while len(self._key_stats) > self.metric_keys:
+            self._key_stats.popitem(last=False)
+
+    async def do(self, key, fn, label=None):
+        task= self._inflight.get(key)
+        self._record(key, label, task is not None)
+
+        if task is None:
+            task= asyncio.ensure_future(fn())
+            self._inflight[key]= task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'inflight': len(self._inflight),
+            'keys': [
+                {'key': key[:16], **stats}
+                for key, stats in reversed(self._key_stats.items()) if stats['collapsed']
+            ],
+        }
+
+
+query_flights= SingleFlight(SINGLEFLIGHT_METRIC_KEYS)
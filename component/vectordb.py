@@ -6,8 +6,18 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import DirectoryLoader, TextLoader, PyMuPDFLoader, PyPDFLoader, JSONLoader, Docx2txtLoader
 from langchain_community.document_loaders.unstructured import UnstructuredFileLoader
 import json
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue, MatchText
+from qdrant_client.http.models import Filter, FieldCondition, FilterSelector, MatchAny, MatchValue, PointStruct, PayloadSchemaType
+
+from component.embedding_cache import EmbeddingStore, CachedEmbeddings
+from component.executors import run_blocking
+from component.rate_limit import is_rate_limited
 
 
 import warnings
@@ -22,13 +32,30 @@ qdrant_key= os.getenv('QDRANT_KEY')
 # size=768
 llm_key= os.getenv('LLM_KEY')
 
-embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001",google_api_key=llm_key)
+EMBEDDING_MODEL= "models/embedding-001"
+
+# Chunk and query vectors persist across uploads, renames and restarts
+EMBEDDING_CACHE_PATH= os.getenv('EMBEDDING_CACHE_PATH', './cache/embeddings.sqlite3')
+EMBEDDING_CACHE_MAX_ENTRIES= int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', 500000))
+
+embedding_store= EmbeddingStore(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+embeddings = CachedEmbeddings(
+    GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL,google_api_key=llm_key),
+    EMBEDDING_MODEL,
+    embedding_store,
+)
 
 client= qdrant_client.QdrantClient(
     url=qdrant_host,
     api_key=qdrant_key
 )
 
+# Used by the query path so searches do not block the event loop
+async_client= qdrant_client.AsyncQdrantClient(
+    url=qdrant_host,
+    api_key=qdrant_key
+)
+
 vector_config= qdrant_client.http.models.VectorParams(
     size= 768,
     distance= qdrant_client.http.models.Distance.COSINE
@@ -38,38 +65,461 @@ vector_config= qdrant_client.http.models.VectorParams(
 
 
 
-def create_vectorstore(collection_name):
-    
-    if True:
-    
-        client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=vector_config
+# Anything in here changing means existing points are incompatible and the
+# collection has to be rebuilt from scratch.
+CHUNK_SIZE= 800
+CHUNK_OVERLAP= 150
+
+
+def index_schema():
+    return {
+        'embedding_model': EMBEDDING_MODEL,
+        'vector_size': vector_config.size,
+        'distance': str(vector_config.distance),
+        'chunk_size': CHUNK_SIZE,
+        'chunk_overlap': CHUNK_OVERLAP,
+    }
+
+
+# Storage layout. "per_folder" keeps one collection per {uuid}-{folder};
+# "shared" stores every folder in QDRANT_SHARED_COLLECTION and scopes all
+# reads and writes with a keyword-indexed metadata.collection filter.
+QDRANT_STORAGE_MODE= os.getenv('QDRANT_STORAGE_MODE', 'per_folder')
+QDRANT_SHARED_COLLECTION= os.getenv('QDRANT_SHARED_COLLECTION', 'documents')
+SHARED_MODE= QDRANT_STORAGE_MODE == 'shared'
+
+TENANT_INDEX_FIELDS= ['metadata.uuid', 'metadata.folder', 'metadata.filename', 'metadata.collection']
+# Per-folder collections only need the index behind file-scoped retrieval
+FOLDER_INDEX_FIELDS= ['metadata.filename']
+
+
+def physical_collection(collection_name):
+    return QDRANT_SHARED_COLLECTION if SHARED_MODE else collection_name
+
+
+def tenant_filter(collection_name, *conditions):
+    must= list(conditions)
+    if SHARED_MODE:
+        must.insert(0, FieldCondition(key="metadata.collection", match=MatchValue(value=collection_name)))
+    return Filter(must=must) if must else None
+
+
+def tenant_metadata(filename):
+    # users/{uuid}/folders/{folder}/{file}
+    parts= filename.split('/')
+    if len(parts) < 5 or parts[0] != 'users' or parts[2] != 'folders':
+        return {}
+    return {'uuid': parts[1], 'folder': parts[3], 'collection': f'{parts[1]}-{parts[3]}'}
+
+
+def create_payload_indexes(physical_name, fields=TENANT_INDEX_FIELDS):
+    for field_name in fields:
+        client.create_payload_index(
+            collection_name=physical_name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD,
+            wait=True
         )
 
-        
-        
 
-    vector_store = Qdrant(
-        client=client, 
-        collection_name=collection_name, 
-        embeddings=embeddings,
+def payload_index_fields():
+    return TENANT_INDEX_FIELDS if SHARED_MODE else FOLDER_INDEX_FIELDS
+
+
+def ensure_payload_indexes(physical_name, payload_schema):
+    # Collections created before an index field was added get it on first open;
+    # create_payload_index is idempotent, so racing workers are harmless
+    missing= [field_name for field_name in payload_index_fields() if field_name not in (payload_schema or {})]
+    if missing:
+        create_payload_indexes(physical_name, missing)
+        print(f"Created payload indexes {missing} on {physical_name}")
+
+
+def _recreate_collection(physical_name):
+    client.recreate_collection(
+        collection_name=physical_name,
+        vectors_config=vector_config
+    )
+    create_payload_indexes(physical_name, payload_index_fields())
+
+
+class VectorStoreRegistry:
+    """
+    Bounded LRU of per-collection LangChain wrappers.
+
+    Each entry holds the Qdrant vector store, its retriever and the
+    collection's existence and vector config, so the query path builds
+    nothing and asks Qdrant for nothing beyond the search itself.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries= max_entries
+        self._entries= OrderedDict()
+        self._lock= threading.Lock()
+
+    def _build(self, collection_name):
+        physical_name= physical_collection(collection_name)
+        vector_store = Qdrant(
+            client=client, 
+            async_client=async_client,
+            collection_name=physical_name, 
+            embeddings=embeddings,
+        )
+        if SHARED_MODE:
+            retriever= vector_store.as_retriever(search_kwargs={'filter': tenant_filter(collection_name)})
+        else:
+            retriever= vector_store.as_retriever()
+
+        exists= client.collection_exists(physical_name)
+        vectors= None
+        if exists:
+            info= client.get_collection(physical_name)
+            vectors= info.config.params.vectors
+            ensure_payload_indexes(physical_name, info.payload_schema)
+        return {'vector_store': vector_store, 'retriever': retriever, 'exists': exists, 'vectors': vectors}
+
+    def cached(self, collection_name):
+        with self._lock:
+            entry= self._entries.get(collection_name)
+            if entry is not None:
+                self._entries.move_to_end(collection_name)
+            return entry
+
+    def get(self, collection_name):
+        with self._lock:
+            entry= self._entries.get(collection_name)
+            if entry is not None:
+                self._entries.move_to_end(collection_name)
+                return entry
+
+        entry= self._build(collection_name)
+        with self._lock:
+            self._entries[collection_name]= entry
+            self._entries.move_to_end(collection_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, collection_name):
+        with self._lock:
+            self._entries.pop(collection_name, None)
+
+
+VECTORSTORE_CACHE_SIZE= int(os.getenv('VECTORSTORE_CACHE_SIZE', 256))
+vectorstore_registry= VectorStoreRegistry(VECTORSTORE_CACHE_SIZE)
+
+
+def collection_matches_schema(collection_name, refresh=False):
+    # Write paths refresh so a collection dropped by another worker is noticed
+    if refresh:
+        vectorstore_registry.invalidate(collection_name)
+    entry= vectorstore_registry.get(collection_name)
+    if not entry['exists']:
+        return False
+    vectors= entry['vectors']
+    return vectors.size == vector_config.size and vectors.distance == vector_config.distance
+
+
+def _create_shared_collection():
+    """
+    Create the shared collection if it does not exist yet. Never recreates it:
+    that would drop every tenant's points. Workers racing on the first upload
+    all end up with the one collection.
+    """
+    if not client.collection_exists(QDRANT_SHARED_COLLECTION):
+        try:
+            client.create_collection(collection_name=QDRANT_SHARED_COLLECTION, vectors_config=vector_config)
+        except Exception:
+            # Another worker created it between the check and the create
+            if not client.collection_exists(QDRANT_SHARED_COLLECTION):
+                raise
+    # Idempotent, so also completes the indexes of a collection another worker just created
+    create_payload_indexes(QDRANT_SHARED_COLLECTION, TENANT_INDEX_FIELDS)
+
+
+# One point per indexed collection in a small side collection, rewritten on
+# every index change. Its payload versions the index for every worker, on any
+# host, without touching the collection's own points.
+QDRANT_INDEX_VERSIONS= os.getenv('QDRANT_INDEX_VERSIONS', 'index_versions')
+
+
+def _version_point_id(collection_name):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, collection_name))
+
+
+def bump_index_version(collection_name):
+    if not client.collection_exists(QDRANT_INDEX_VERSIONS):
+        try:
+            client.create_collection(
+                collection_name=QDRANT_INDEX_VERSIONS,
+                vectors_config=qdrant_client.http.models.VectorParams(size=1, distance=qdrant_client.http.models.Distance.DOT)
+            )
+        except Exception:
+            if not client.collection_exists(QDRANT_INDEX_VERSIONS):
+                raise
+    version= time.time_ns()
+    client.upsert(
+        collection_name=QDRANT_INDEX_VERSIONS,
+        points=[PointStruct(id=_version_point_id(collection_name), vector=[1.0], payload={'collection': collection_name, 'version': version})],
+        wait=True
     )
+    return version
 
-    return vector_store
+
+async def aindex_version(collection_name):
+    """
+    The collection's current index version, 0 if it was never indexed. A
+    failed read also returns 0, which only costs cache misses: entries
+    stored under a real version never match it.
+    """
+    try:
+        points= await async_client.retrieve(
+            collection_name=QDRANT_INDEX_VERSIONS,
+            ids=[_version_point_id(collection_name)],
+            with_payload=True,
+            with_vectors=False
+        )
+    except Exception as e:
+        print(f"Index version of {collection_name} unavailable: {e}")
+        return 0
+    return points[0].payload.get('version', 0) if points else 0
+
+
+def create_vectorstore(collection_name, recreate=False):
+    physical_name= physical_collection(collection_name)
+    
+    if SHARED_MODE:
+        if not collection_matches_schema(collection_name, refresh=True):
+            _create_shared_collection()
+            if not collection_matches_schema(collection_name, refresh=True):
+                # Rebuilding would wipe every tenant; that is an offline migration
+                raise RuntimeError(
+                    f"Shared collection {QDRANT_SHARED_COLLECTION} does not match the vector config "
+                    f"{vector_config.size}/{vector_config.distance}; refusing to recreate it from a request"
+                )
+        if recreate:
+            delete_collection(collection_name)
+
+    elif recreate or not collection_matches_schema(collection_name, refresh=True):
+        _recreate_collection(physical_name)
+
+    vectorstore_registry.invalidate(collection_name)
+    return vectorstore_registry.get(collection_name)['vector_store']
+
+# Embedding scheduler: chunks are embedded in provider-sized batches, several
+# batches in flight at once, paced by a token bucket that halves its rate on
+# 429s and creeps back up on success. Each batch is upserted as soon as its
+# vectors arrive.
+EMBED_BATCH_SIZE= int(os.getenv('EMBED_BATCH_SIZE', 100))
+EMBED_CONCURRENCY= int(os.getenv('EMBED_CONCURRENCY', 4))
+EMBED_REQUESTS_PER_MINUTE= float(os.getenv('EMBED_REQUESTS_PER_MINUTE', 1500))
+EMBED_MAX_RETRIES= int(os.getenv('EMBED_MAX_RETRIES', 6))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute):
+        self.max_rate= rate_per_minute / 60.0
+        self.rate= self.max_rate
+        self.capacity= max(1.0, self.max_rate)
+        self.tokens= self.capacity
+        self.updated= time.monotonic()
+        self.paused_until= 0.0
+        self._lock= threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now= time.monotonic()
+                self.tokens= min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated= now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens-= 1
+                    return
+                wait= max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def slow_down(self, pause):
+        with self._lock:
+            self.rate= max(self.max_rate / 32, self.rate / 2)
+            self.paused_until= max(self.paused_until, time.monotonic() + pause)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate= min(self.max_rate, self.rate * 1.05)
+
+
+embed_rate_limiter= TokenBucket(EMBED_REQUESTS_PER_MINUTE)
+
+
+def _embed_with_backoff(vector_store, texts):
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        embed_rate_limiter.acquire()
+        try:
+            vectors= vector_store.embeddings.embed_documents(texts)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == EMBED_MAX_RETRIES:
+                raise
+            pause= min(60, 2 ** attempt) * (0.5 + random.random())
+            print(f"Embedding batch rate limited, retrying in {pause:.1f}s (attempt {attempt + 1}/{EMBED_MAX_RETRIES})")
+            embed_rate_limiter.slow_down(pause)
+            continue
+        embed_rate_limiter.speed_up()
+        return vectors
+
+
+def _embed_and_upsert(vector_store, docs):
+    for doc in docs:
+        doc.metadata.update(tenant_metadata(doc.metadata.get('filename', '')))
+
+    texts= [doc.page_content for doc in docs]
+    vectors= _embed_with_backoff(vector_store, texts)
+    points= [
+        PointStruct(
+            id=uuid.uuid4().hex,
+            vector=vector,
+            payload={
+                vector_store.content_payload_key: doc.page_content,
+                vector_store.metadata_payload_key: doc.metadata,
+            }
+        )
+        for doc, vector in zip(docs, vectors)
+    ]
+    client.upsert(collection_name=vector_store.collection_name, points=points, wait=True)
+    return len(points)
+
+
+def add_documents_batched(vector_store, docs):
+    started= time.perf_counter()
+    batches= [docs[i:i + EMBED_BATCH_SIZE] for i in range(0, len(docs), EMBED_BATCH_SIZE)]
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix='embed') as executor:
+        done= sum(future.result() for future in as_completed(
+            executor.submit(_embed_and_upsert, vector_store, batch) for batch in batches
+        ))
+
+    elapsed= time.perf_counter() - started
+    if elapsed:
+        print(f"Embedded {done} chunks into {vector_store.collection_name} in {elapsed:.2f}s ({done / elapsed:.1f} chunks/sec)")
+    return done
 
 def append_PDFdata_vectorstore(vector_store,data_lst):
    
     
     
-    text_splitter= RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150, length_function= len)
+    text_splitter= RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function= len)
     docs=text_splitter.split_documents(data_lst)
+    if not docs:
+        return
 
     doc= docs[0]
 
     print(doc.metadata)
 
-    vector_store.add_documents(docs)
+    add_documents_batched(vector_store, docs)
+
+def delete_file_points(collection_name, filenames):
+    client.delete(
+        collection_name=physical_collection(collection_name),
+        points_selector=FilterSelector(
+            filter=tenant_filter(
+                collection_name,
+                FieldCondition(
+                    key="metadata.filename",
+                    match=MatchAny(any=list(filenames))
+                )
+            )
+        )
+    )
+
+RENAME_BATCH_SIZE= int(os.getenv('RENAME_BATCH_SIZE', 256))
+
+
+def indexed_files(collection_name):
+    """
+    {filename: md5} of the files a collection holds points for, read back
+    from the payloads. Points embedded before md5s were stamped map to None.
+    """
+    files= {}
+    offset= None
+    while True:
+        points, offset= client.scroll(
+            collection_name=physical_collection(collection_name),
+            scroll_filter=tenant_filter(collection_name),
+            limit=RENAME_BATCH_SIZE,
+            offset=offset,
+            with_payload=['metadata.filename', 'metadata.file_md5'],
+            with_vectors=False
+        )
+        for point in points:
+            metadata= (point.payload or {}).get('metadata') or {}
+            filename= metadata.get('filename')
+            if filename and files.get(filename) is None:
+                files[filename]= metadata.get('file_md5')
+        if offset is None:
+            break
+    return files
+
+
+def _renamed_payload(payload, old_prefix, new_prefix):
+    metadata= payload.get('metadata') or {}
+    filename= metadata.get('filename')
+    if filename and filename.startswith(old_prefix):
+        metadata['filename']= new_prefix + filename[len(old_prefix):]
+        metadata.update(tenant_metadata(metadata['filename']))
+    return payload
+
+
+def rename_collection(old_collection_name, new_collection_name, old_prefix, new_prefix):
+    """
+    Move every point of a collection to a new name without re-embedding,
+    rewriting the filename prefix of each payload.
+
+    In per-folder mode points are copied into a new collection and the old one
+    is dropped; in shared mode they are rewritten in place under the same ids.
+
+    Returns:
+        False if there was nothing to move, True otherwise
+    """
+    if not collection_matches_schema(old_collection_name, refresh=True):
+        return False
+
+    if SHARED_MODE:
+        if old_collection_name != new_collection_name:
+            delete_collection(new_collection_name)
+        target= QDRANT_SHARED_COLLECTION
+        scroll_filter= tenant_filter(old_collection_name)
+    else:
+        target= new_collection_name
+        scroll_filter= None
+        _recreate_collection(new_collection_name)
+
+    offset= None
+    copied= 0
+    while True:
+        points, offset= client.scroll(
+            collection_name=physical_collection(old_collection_name),
+            scroll_filter=scroll_filter,
+            limit=RENAME_BATCH_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if points:
+            batch= [
+                PointStruct(id=point.id, vector=point.vector, payload=_renamed_payload(point.payload, old_prefix, new_prefix))
+                for point in points
+            ]
+            client.upsert(collection_name=target, points=batch, wait=True)
+            copied+= len(batch)
+        if offset is None:
+            break
+
+    if not SHARED_MODE:
+        client.delete_collection(collection_name=old_collection_name)
+    vectorstore_registry.invalidate(old_collection_name)
+    vectorstore_registry.invalidate(new_collection_name)
+    print(f"Renamed {old_collection_name} -> {new_collection_name}: {copied} points moved")
+    return copied > 0 or not SHARED_MODE
 
 def append_DOCXdata_vectorstore(vector_store,collection_path):
    # loader= DirectoryLoader(collection_path,glob="**/*.txt" ,loader_cls=TextLoader)
@@ -80,10 +530,10 @@ def append_DOCXdata_vectorstore(vector_store,collection_path):
     documents= loader.load()
     
 
-    text_splitter= RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150, length_function= len)
+    text_splitter= RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function= len)
     docs=text_splitter.split_documents(documents)
 
-    vector_store.add_documents(docs)
+    add_documents_batched(vector_store, docs)
 
 def append_txtdata_vectorstore(vector_store,collection_path):
    # loader= DirectoryLoader(collection_path,glob="**/*.txt" ,loader_cls=TextLoader)
@@ -94,131 +544,123 @@ def append_txtdata_vectorstore(vector_store,collection_path):
     documents= loader.load()
     
 
-    text_splitter= RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150, length_function= len)
+    text_splitter= RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, length_function= len)
     docs=text_splitter.split_documents(documents)
 
 
-    vector_store.add_documents(docs)
+    add_documents_batched(vector_store, docs)
 
     
 
 
 
 def vector_store_to_retriever(collection_name):
-    vector_store = Qdrant(
-        client=client, 
-        collection_name=collection_name, 
-        embeddings=embeddings,
-    )
-    return vector_store.as_retriever()
+    return vectorstore_registry.get(collection_name)['retriever']
 
 
 
 
 
-def metadata_retriever(collection_name, meta_val, query):
-    vector_store = Qdrant(
-        client=client, 
-        collection_name=collection_name, 
-        embeddings=embeddings,
+async def _aregistry_entry(collection_name):
+    entry= vectorstore_registry.cached(collection_name)
+    if entry is None:
+        # First use of a collection looks up its info, keep that off the loop
+        entry= await run_blocking(vectorstore_registry.get, collection_name)
+    return entry
+
+
+async def avector_store_to_retriever(collection_name):
+    return (await _aregistry_entry(collection_name))['retriever']
+
+
+def _file_filter(collection_name, meta_val):
+    return tenant_filter(
+        collection_name,
+        FieldCondition(
+            key="metadata.filename",
+            match=MatchValue(value=meta_val)
+        )
     )
 
-    print(f"\nDebug Information:")
-    print(f"1. Collection name: {collection_name}")
-    print(f"2. Searching for filename: {meta_val}")
-    print(f"3. Query: {query}")
 
-    # First, let's check what's in the collection
+def _no_match_error(collection_name, meta_val, all_docs):
+    error= {
+        "error": "No matching documents found",
+        "details": {
+            "collection": collection_name,
+            "searched_filename": meta_val,
+            "available_files": [(doc.payload.get("metadata") or {}).get("filename") for doc in all_docs]
+        }
+    }
+    print(error)
+    return error
+
+
+def _retrieval_error(collection_name, meta_val, e):
+    error= {
+        "error": f"Error in retrieval: {str(e)}",
+        "details": {
+            "collection": collection_name,
+            "searched_filename": meta_val
+        }
+    }
+    print(error)
+    return error
+
+
+def metadata_retriever(collection_name, meta_val, query):
+    vector_store = vectorstore_registry.get(collection_name)['vector_store']
+
     try:
-        # Get all documents in the collection
+        # One embedding, one search, served by the keyword index on metadata.filename
+        query_vector= embeddings.embed_query(query)
+        docs = vector_store.similarity_search_by_vector(
+            query_vector,
+            k=3,
+            filter=_file_filter(collection_name, meta_val)
+        )
+        if docs:
+            return docs[0].page_content
+
+        # Miss path only: list a few files to explain what the collection holds
         all_docs = client.scroll(
-            collection_name=collection_name,
-            limit=10,  # Get first 10 documents
+            collection_name=physical_collection(collection_name),
+            scroll_filter=tenant_filter(collection_name),
+            limit=10,
             with_payload=True
         )[0]
+        return _no_match_error(collection_name, meta_val, all_docs)
         
-        print("\n4. Sample documents in collection:")
-        for doc in all_docs[:3]:  # Show first 3 documents
-            print(f"   Metadata: {doc.payload}")
-        
-        # Try the search with different matching strategies
-        strategies = [
-            # Exact match
-            Filter(
-                must=[
-                    FieldCondition(
-                        key="filename",
-                        match=MatchValue(value=meta_val)
-                    )
-                ]
-            ),
-            # Partial match
-            Filter(
-                must=[
-                    FieldCondition(
-                        key="filename",
-                        match=MatchText(text=meta_val)
-                    )
-                ]
-            ),
-            {"filename":meta_val}
-        ]
-        
-        for i, filter_condition in enumerate(strategies):
-            print(f"\n5. Trying search strategy {i+1}")
-            docs = vector_store.similarity_search(
-                query=query,
-                k=3,
-                filter=filter_condition
-            )
-            
+    except Exception as e:
+        return _retrieval_error(collection_name, meta_val, e)
+
+
+async def ametadata_retriever(collection_name, meta_val, query):
+    vector_store = (await _aregistry_entry(collection_name))['vector_store']
+
+    try:
+        query_vector= await embeddings.aembed_query(query)
+        docs = await vector_store.asimilarity_search_by_vector(
+            query_vector,
+            k=3,
+            filter=_file_filter(collection_name, meta_val)
+        )
+        if docs:
+            return docs[0].page_content
+
+        all_docs = (await async_client.scroll(
+            collection_name=physical_collection(collection_name),
+            scroll_filter=tenant_filter(collection_name),
+            limit=10,
+            with_payload=True
+        ))[0]
+        return _no_match_error(collection_name, meta_val, all_docs)
 
-            if docs:
-                print(f"   Found {len(docs)} documents!")
-                return docs[0].page_content
-            else:
-                print(f"   Strategy {i+1} found no documents")
-        
-        # If no documents found with any strategy
-        print( {
-            "error": "No matching documents found",
-            "details": {
-                "collection": collection_name,
-                "searched_filename": meta_val,
-                "available_files": [doc.payload.get("filename") for doc in all_docs]
-            }
-        })
-        return {
-            "error": "No matching documents found",
-            "details": {
-                "collection": collection_name,
-                "searched_filename": meta_val,
-                "available_files": [doc.payload.get("filename") for doc in all_docs]
-            }
-        }
-        
     except Exception as e:
-        error_msg = f"Error in retrieval: {str(e)}"
-        print({"exception":"sdsd",
-            "error": error_msg,
-            "details": {
-                "collection": collection_name,
-                "searched_filename": meta_val
-            }
-        })
-        return {
-            "error": error_msg,
-            "details": {
-                "collection": collection_name,
-                "searched_filename": meta_val
-            }
-        }
+        return _retrieval_error(collection_name, meta_val, e)
 
 
-def retrieve_content(retriever,query):
-    
-    docs=retriever.invoke(query)
-    print(len(docs))
+def _content_from_docs(docs):
     content=docs[0]
     
     chunk= content.page_content
@@ -241,12 +683,33 @@ def retrieve_content(retriever,query):
         
         
         return chunk, filename, foldername
+
+
+def retrieve_content(retriever,query):
+    
+    docs=retriever.invoke(query)
+    print(len(docs))
+    return _content_from_docs(docs)
+
+
+async def aretrieve_content(retriever,query):
+    docs= await retriever.ainvoke(query)
+    return _content_from_docs(docs)
     
 
 
 
 def delete_collection(collection_name):
-    client.delete_collection(collection_name=collection_name)
+    vectorstore_registry.invalidate(collection_name)
+    if SHARED_MODE:
+        if not client.collection_exists(QDRANT_SHARED_COLLECTION):
+            return
+        client.delete(
+            collection_name=QDRANT_SHARED_COLLECTION,
+            points_selector=FilterSelector(filter=tenant_filter(collection_name))
+        )
+    else:
+        client.delete_collection(collection_name=collection_name)
  
 
 